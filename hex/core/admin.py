@@ -7,6 +7,7 @@ from django.utils.translation import gettext_lazy as _
 
 from .models import User
 from tiers.models import (
+    AccountPlan,
     Tier,
     CustomImages,
 )
@@ -54,3 +55,4 @@ class UserAdmin(BaseUserAdmin):
 admin.site.register(User, UserAdmin)
 admin.site.register(Tier)
 admin.site.register(CustomImages)
+admin.site.register(AccountPlan)
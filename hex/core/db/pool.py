@@ -0,0 +1,116 @@
+"""
+Process wide pools of open database connections.
+"""
+import threading
+
+from django.db.utils import OperationalError
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    """Thread safe pool of open connections, waiting up to timeout
+        for a connection to be returned when all of them are in use."""
+
+    def __init__(self, connect, max_size, timeout):
+        self.connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = []
+        self._in_use = 0
+        self._condition = threading.Condition()
+        self._stats = dict.fromkeys(
+            ['requests', 'waits', 'timeouts', 'opened', 'closed'], 0
+        )
+
+    def _available(self):
+        return self._idle or self._in_use < self.max_size
+
+    def get(self):
+        """Return idle connection, or a new one while below max size.
+            Second item tells if the connection was reused."""
+        with self._condition:
+            self._stats['requests'] += 1
+            if not self._available():
+                self._stats['waits'] += 1
+                if not self._condition.wait_for(self._available,
+                                                self.timeout):
+                    self._stats['timeouts'] += 1
+                    raise OperationalError(
+                        'Timed out waiting for a pooled database connection.'
+                    )
+            self._in_use += 1
+            if self._idle:
+                return self._idle.pop(), True
+
+        try:
+            connection = self.connect()
+        except Exception:
+            with self._condition:
+                self._in_use -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._stats['opened'] += 1
+        return connection, False
+
+    def put(self, connection, discard=False):
+        """Return connection to the pool, closing it if discarded."""
+        if discard:
+            self._close(connection)
+        with self._condition:
+            self._in_use -= 1
+            if discard:
+                self._stats['closed'] += 1
+            else:
+                self._idle.append(connection)
+            self._condition.notify()
+
+    def close_idle(self):
+        """Close connections nobody is using."""
+        with self._condition:
+            idle, self._idle = self._idle, []
+            self._stats['closed'] += len(idle)
+        for connection in idle:
+            self._close(connection)
+
+    def _close(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def stats(self):
+        """Return pool usage counters."""
+        with self._condition:
+            return {
+                'max_size': self.max_size,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                **self._stats,
+            }
+
+
+def get_pool(key, connect, max_size, timeout):
+    """Return pool registered under key, creating it on first use."""
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(connect, max_size, timeout)
+        return _pools[key]
+
+
+def close_idle():
+    """Close idle connections of every pool."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close_idle()
+
+
+def pool_stats():
+    """Return usage counters of every pool keyed by database alias."""
+    with _pools_lock:
+        pools = list(_pools.items())
+    return {f'{alias}:{name}': pool.stats()
+            for (alias, name, params), pool in pools}
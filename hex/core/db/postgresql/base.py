@@ -0,0 +1,116 @@
+"""
+PostgreSQL backend with connection health checks and optional pooling.
+"""
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+from django.db.backends.postgresql import base, creation
+from django.utils.asyncio import async_unsafe
+
+from core.db import pool
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    """Test database creation closing pooled connections first,
+        PostgreSQL refuses to drop a database someone is connected to."""
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        pool.close_idle()
+        super()._destroy_test_db(test_database_name, verbosity)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL backend borrowing connections from a process wide pool
+        when settings POOL MAX_SIZE is set, which turns CONN_MAX_AGE off,
+        and checking persistent connections before reusing them when
+        CONN_HEALTH_CHECKS is."""
+    creation_class = DatabaseCreation
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_done = False
+        self.connection_pool = None
+        if self.pool_options.get('MAX_SIZE'):
+            # Connections kept by threads that exit are never returned,
+            # so give them back at the end of every request instead.
+            self.settings_dict['CONN_MAX_AGE'] = 0
+
+    @property
+    def pool_options(self):
+        return self.settings_dict.get('POOL') or {}
+
+    @property
+    def health_check_enabled(self):
+        return self.settings_dict.get('CONN_HEALTH_CHECKS', False)
+
+    def _get_pool(self, conn_params):
+        key = (self.alias, self.settings_dict['NAME'],
+               repr(sorted(conn_params.items())))
+        return pool.get_pool(
+            key,
+            lambda: super(DatabaseWrapper, self).get_new_connection(
+                conn_params
+            ),
+            self.pool_options['MAX_SIZE'],
+            self.pool_options.get('TIMEOUT', 10),
+        )
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        if not self.pool_options.get('MAX_SIZE'):
+            return super().get_new_connection(conn_params)
+
+        self.connection_pool = connection_pool = self._get_pool(conn_params)
+        while True:
+            connection, reused = connection_pool.get()
+            if (reused and self.health_check_enabled
+                    and not self._ping(connection)):
+                connection_pool.put(connection, discard=True)
+                continue
+            # Connection may have been opened by a wrapper of another thread.
+            self.isolation_level = self.settings_dict['OPTIONS'].get(
+                'isolation_level', connection.isolation_level
+            )
+            return connection
+
+    def _ping(self, connection):
+        """Return whether raw connection still works."""
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except base.Database.Error:
+            return False
+        return True
+
+    def _close(self):
+        if self.connection is None or self.connection_pool is None:
+            return super()._close()
+
+        connection = self.connection
+        discard = bool(connection.closed)
+        if not discard:
+            try:
+                status = connection.info.transaction_status
+                if status != TRANSACTION_STATUS_IDLE:
+                    connection.rollback()
+            except base.Database.Error:
+                discard = True
+        self.connection_pool.put(connection, discard=discard)
+
+    def connect(self):
+        super().connect()
+        self.health_check_done = True
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        # Check the kept connection once, before the next request uses it.
+        self.health_check_done = False
+
+    def ensure_connection(self):
+        if (self.connection is not None
+                and self.health_check_enabled
+                and not self.health_check_done
+                and not self.in_atomic_block):
+            self.health_check_done = True
+            if not self.is_usable():
+                self.close()
+        super().ensure_connection()
@@ -0,0 +1,52 @@
+"""
+JSON renderer using orjson when installed.
+"""
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Characters valid in JSON strings but not in javascript ones.
+JAVASCRIPT_ESCAPES = [
+    ('\u2028'.encode(), b'\\u2028'),
+    ('\u2029'.encode(), b'\\u2029'),
+]
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSON renderer encoding with orjson, matching stdlib output of
+        compact, unicode, strict JSON. Other settings, indented output
+        and payloads orjson refuses fall back to the stdlib encoder."""
+    options = 0 if orjson is None else (
+        orjson.OPT_NON_STR_KEYS
+        | orjson.OPT_PASSTHROUGH_DATETIME
+        | orjson.OPT_PASSTHROUGH_DATACLASS
+    )
+
+    def _stdlib_only(self, accepted_media_type, renderer_context):
+        return (orjson is None
+                or self.ensure_ascii
+                or not self.compact
+                or not self.strict
+                or self.get_indent(accepted_media_type,
+                                   renderer_context or {}) is not None)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None or self._stdlib_only(accepted_media_type,
+                                             renderer_context):
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        try:
+            ret = orjson.dumps(data,
+                               default=self.encoder_class().default,
+                               option=self.options)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        # Same as stdlib renderer, keep output a strict javascript subset.
+        for char, escaped in JAVASCRIPT_ESCAPES:
+            if char in ret:
+                ret = ret.replace(char, escaped)
+        return ret
@@ -0,0 +1,41 @@
+"""
+Test runner keeping files shared by processes out of /vol/web.
+"""
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """Run tests with file based caches and locks in a temporary
+        directory."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.tmp_dir = tempfile.mkdtemp(prefix='hex-tests-')
+        self.isolated_settings = override_settings(
+            CACHES={
+                'default': {
+                    'BACKEND':
+                        'django.core.cache.backends.locmem.LocMemCache',
+                },
+                'responses': {
+                    'BACKEND': 'django.core.cache.backends.filebased'
+                               '.FileBasedCache',
+                    'LOCATION': os.path.join(self.tmp_dir, 'responses'),
+                    'OPTIONS': settings.CACHES['responses'].get('OPTIONS',
+                                                                {}),
+                },
+            },
+            RENDER_LOCK_DIR=os.path.join(self.tmp_dir, 'locks'),
+        )
+        self.isolated_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.isolated_settings.disable()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,191 @@
+"""
+Tests for database connection pooling.
+"""
+from unittest.mock import MagicMock, patch
+
+from psycopg2 import OperationalError as Psycopg2Error
+from psycopg2.extensions import TRANSACTION_STATUS_INTRANS
+
+from django.contrib.auth import get_user_model
+from django.db.utils import OperationalError
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.db import pool
+from core.db.postgresql.base import DatabaseWrapper
+
+
+def create_wrapper(**params):
+    """Create and return a pooling backend not connected yet."""
+    settings_dict = {
+        'ENGINE': 'core.db.postgresql',
+        'NAME': 'pooltest',
+        'USER': '',
+        'PASSWORD': '',
+        'HOST': '',
+        'PORT': '',
+        'OPTIONS': {},
+        'AUTOCOMMIT': True,
+        'ATOMIC_REQUESTS': False,
+        'CONN_MAX_AGE': 0,
+        'CONN_HEALTH_CHECKS': True,
+        'TIME_ZONE': None,
+        'POOL': {'MAX_SIZE': 2, 'TIMEOUT': 0.01},
+    }
+    settings_dict.update(params)
+    return DatabaseWrapper(settings_dict, alias='pooltest')
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """Test the generic connection pool."""
+
+    def test_reuses_returned_connection(self):
+        """Test connections returned to the pool are handed out again."""
+        connection_pool = pool.ConnectionPool(MagicMock, 2, 0.01)
+
+        connection, reused = connection_pool.get()
+        connection_pool.put(connection)
+        again, reused_again = connection_pool.get()
+
+        self.assertFalse(reused)
+        self.assertTrue(reused_again)
+        self.assertIs(again, connection)
+        self.assertEqual(connection_pool.stats()['opened'], 1)
+
+    def test_times_out_when_exhausted(self):
+        """Test waiting for a connection fails after timeout."""
+        connection_pool = pool.ConnectionPool(MagicMock, 1, 0.01)
+        connection_pool.get()
+
+        with self.assertRaises(OperationalError):
+            connection_pool.get()
+
+        stats = connection_pool.stats()
+        self.assertEqual(stats['waits'], 1)
+        self.assertEqual(stats['timeouts'], 1)
+
+    def test_discarded_connection_is_closed(self):
+        """Test discarded connections are closed and free their slot."""
+        connection_pool = pool.ConnectionPool(MagicMock, 1, 0.01)
+        connection, reused = connection_pool.get()
+
+        connection_pool.put(connection, discard=True)
+        again, reused = connection_pool.get()
+
+        connection.close.assert_called_once()
+        self.assertIsNot(again, connection)
+        self.assertEqual(connection_pool.stats()['closed'], 1)
+
+
+@patch('django.db.backends.postgresql.base.DatabaseWrapper'
+       '.get_new_connection')
+class PoolingBackendTests(SimpleTestCase):
+    """Test PostgreSQL backend borrowing pooled connections."""
+
+    def setUp(self):
+        pool._pools.clear()
+
+    def tearDown(self):
+        pool._pools.clear()
+
+    def test_close_returns_connection_to_pool(self, connect):
+        """Test closing keeps the connection open for the next user."""
+        raw = MagicMock(closed=0, isolation_level=None)
+        connect.return_value = raw
+        first, second = create_wrapper(), create_wrapper()
+
+        first.connection = first.get_new_connection({'dbname': 'x'})
+        first._close()
+        connection = second.get_new_connection({'dbname': 'x'})
+
+        self.assertIs(connection, raw)
+        connect.assert_called_once()
+        raw.close.assert_not_called()
+
+    def test_close_rolls_back_open_transaction(self, connect):
+        """Test pooled connections are returned outside a transaction."""
+        raw = MagicMock(closed=0)
+        raw.info.transaction_status = TRANSACTION_STATUS_INTRANS
+        connect.return_value = raw
+        wrapper = create_wrapper()
+
+        wrapper.connection = wrapper.get_new_connection({'dbname': 'x'})
+        wrapper._close()
+
+        raw.rollback.assert_called_once()
+
+    def test_broken_pooled_connection_replaced(self, connect):
+        """Test health check discards connections that stopped working."""
+        broken = MagicMock(closed=0)
+        broken.cursor.return_value.__enter__.return_value \
+            .execute.side_effect = Psycopg2Error
+        fresh = MagicMock(closed=0)
+        connect.side_effect = [broken, fresh]
+        wrapper = create_wrapper()
+
+        wrapper.connection = wrapper.get_new_connection({'dbname': 'x'})
+        wrapper._close()
+        connection = wrapper.get_new_connection({'dbname': 'x'})
+
+        self.assertIs(connection, fresh)
+        broken.close.assert_called_once()
+
+    def test_pool_disables_persistent_connections(self, connect):
+        """Test pooled connections are returned after every request."""
+        connect.return_value = MagicMock(closed=0)
+        wrapper = create_wrapper(CONN_MAX_AGE=60)
+
+        wrapper.connect()
+        wrapper.close_if_unusable_or_obsolete()
+
+        self.assertEqual(wrapper.settings_dict['CONN_MAX_AGE'], 0)
+        self.assertIsNone(wrapper.connection)
+        self.assertEqual(wrapper.connection_pool.stats()['idle'], 1)
+
+    def test_no_pool_without_max_size(self, connect):
+        """Test every connection is opened when pooling is disabled."""
+        wrapper = create_wrapper(POOL={'MAX_SIZE': 0})
+
+        wrapper.get_new_connection({'dbname': 'x'})
+
+        connect.assert_called_once()
+        self.assertEqual(pool.pool_stats(), {})
+
+
+class PoolStatsApiTests(TestCase):
+    """Test the pool stats endpoint."""
+
+    def test_requires_admin(self):
+        """Test pool stats are only visible to staff."""
+        user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+
+        res = client.get(reverse('db-stats'))
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_lists_pools(self):
+        """Test pool stats are returned per pool."""
+        admin = get_user_model().objects.create_superuser(
+            email='admin@example.com',
+            password='testpass123',
+        )
+        client = APIClient()
+        client.force_authenticate(admin)
+        connection_pool = pool.get_pool(('default', 'devdb', ''),
+                                        MagicMock, 5, 1)
+        connection_pool.get()
+        self.addCleanup(pool._pools.clear)
+
+        res = client.get(reverse('db-stats'))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['default:devdb']['in_use'], 1)
+        self.assertEqual(res.data['default:devdb']['max_size'], 5)
@@ -0,0 +1,84 @@
+"""
+Tests for JSON renderer and parser.
+"""
+import datetime
+import decimal
+import uuid
+
+from io import BytesIO
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+
+PAYLOAD = {
+    'aware': datetime.datetime(2022, 5, 1, 12, 30, 15, 123456,
+                               tzinfo=timezone.utc),
+    'naive': datetime.datetime(2022, 5, 1, 12, 30),
+    'date': datetime.date(2022, 5, 1),
+    'time': datetime.time(12, 30, 15),
+    'duration': datetime.timedelta(minutes=5),
+    'decimal': decimal.Decimal('12.50'),
+    'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+    'lazy': gettext_lazy('Not found.'),
+    'unicode': 'zażółć \u2028 \u2029',
+    'nested': [{1: None, 'list': (1, 2.5, True)}],
+}
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    """Test orjson renderer matches the stdlib one."""
+
+    def test_matches_stdlib_renderer(self):
+        """Test special types render exactly as with stdlib json."""
+        self.assertEqual(FastJSONRenderer().render(PAYLOAD),
+                         JSONRenderer().render(PAYLOAD))
+
+    def test_indent_uses_stdlib(self):
+        """Test indented output is left to the stdlib encoder."""
+        media_type = 'application/json; indent=4'
+
+        self.assertEqual(FastJSONRenderer().render(PAYLOAD, media_type),
+                         JSONRenderer().render(PAYLOAD, media_type))
+
+    def test_large_int_uses_stdlib(self):
+        """Test integers orjson refuses still render."""
+        self.assertEqual(FastJSONRenderer().render({'big': 2 ** 70}),
+                         b'{"big":1180591620717411303424}')
+
+    @patch('core.renderers.orjson', None)
+    def test_without_orjson(self):
+        """Test stdlib encoder is used when orjson is missing."""
+        self.assertEqual(FastJSONRenderer().render(PAYLOAD),
+                         JSONRenderer().render(PAYLOAD))
+
+
+class FastJSONParserTests(SimpleTestCase):
+    """Test orjson parser."""
+
+    def test_parse(self):
+        """Test parsing JSON body."""
+        data = FastJSONParser().parse(
+            BytesIO('{"name": "zażółć", "ids": [1, 2]}'.encode())
+        )
+
+        self.assertEqual(data, {'name': 'zażółć', 'ids': [1, 2]})
+
+    def test_invalid_json(self):
+        """Test invalid and non strict JSON raise parse error."""
+        for body in [b'{"name": ', b'{"value": NaN}']:
+            with self.assertRaises(ParseError):
+                FastJSONParser().parse(BytesIO(body))
+
+    @patch('core.parsers.orjson', None)
+    def test_without_orjson(self):
+        """Test stdlib decoder is used when orjson is missing."""
+        self.assertEqual(FastJSONParser().parse(BytesIO(b'{"id": 1}')),
+                         {'id': 1})
@@ -82,11 +82,23 @@ WSGI_APPLICATION = 'hex.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.db.postgresql',
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        # Seconds to keep a connection open between requests, checking
+        # it works before reuse. Use 0 under ASGI, the pool forces 0.
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': bool(
+            int(os.environ.get('DB_CONN_HEALTH_CHECKS', 1))
+        ),
+        # Process wide connection pool shared by all threads,
+        # MAX_SIZE 0 disables it.
+        'POOL': {
+            'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', 0)),
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        },
     }
 }
 
@@ -138,12 +150,120 @@ AUTH_USER_MODEL = 'core.User'
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'user.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ),
-
+    # JSON is encoded and decoded with orjson when it is installed.
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
 SPECTACULAR_SETTINGS = {
     'COMPONENT_SPLIT_REQUEST': True,
 }
+
+# Authenticated tokens cached in every process and their lifetime
+# in seconds.
+TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', 10000))
+TOKEN_CACHE_TTL = int(os.environ.get('TOKEN_CACHE_TTL', 60))
+
+# Caches shared by processes through the filesystem. Responses holds
+# rendered lists of tiers and custom images.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('RESPONSE_CACHE_DIR',
+                                   '/vol/web/cache/responses'),
+        # Lists are cached per user and page, keep room for every active
+        # user. Culling removes 1/CULL_FREQUENCY of the entries once full.
+        'OPTIONS': {
+            'MAX_ENTRIES': int(
+                os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 50000)
+            ),
+            'CULL_FREQUENCY': int(
+                os.environ.get('RESPONSE_CACHE_CULL_FREQUENCY', 10)
+            ),
+        },
+    },
+}
+
+# Runs tests with file based caches and locks in a temporary directory.
+TEST_RUNNER = 'core.test_runner.TestRunner'
+
+# Cache holding list responses and seconds they are kept, 0 disables it.
+LIST_CACHE_ALIAS = 'responses'
+LIST_CACHE_TTL = int(os.environ.get('LIST_CACHE_TTL', 60))
+
+# Seconds account plans stay cached in every process.
+ACCOUNT_PLAN_CACHE_TTL = int(os.environ.get('ACCOUNT_PLAN_CACHE_TTL', 300))
+
+# Number of processes rendering thumbnails in the background,
+# 0 renders them inline on upload.
+THUMBNAIL_RENDER_WORKERS = int(os.environ.get('THUMBNAIL_RENDER_WORKERS', 2))
+
+# Render missing thumbnails once, under a lock shared by processes.
+IMAGEKIT_DEFAULT_CACHEFILE_BACKEND = 'tiers.cachefiles.CoalescingBackend'
+RENDER_LOCK_DIR = os.environ.get('RENDER_LOCK_DIR', '/vol/web/locks')
+# Number of lock files rendered names are hashed into.
+RENDER_LOCK_SLOTS = int(os.environ.get('RENDER_LOCK_SLOTS', 256))
+
+# Location, relative to MEDIA_ROOT, and size in bytes of the disk cache
+# of thumbnails rendered on demand.
+DYNAMIC_THUMBNAIL_DIR = 'CACHE/dynamic'
+DYNAMIC_THUMBNAIL_CACHE_BYTES = int(
+    os.environ.get('DYNAMIC_THUMBNAIL_CACHE_BYTES', 1024 ** 3)
+)
+
+# Largest image, in pixels, accepted on upload when account plan sets
+# no lower budget. Pillow refuses to open anything twice as large.
+MAX_IMAGE_PIXELS = int(os.environ.get('MAX_IMAGE_PIXELS', 50_000_000))
+
+# Maximum number of images accepted by a single bulk upload.
+BULK_UPLOAD_MAX_FILES = int(os.environ.get('BULK_UPLOAD_MAX_FILES', 1000))
+
+# Django rejects multipart requests with more files before the bulk upload
+# limit applies, so keep both limits the same.
+DATA_UPLOAD_MAX_NUMBER_FILES = BULK_UPLOAD_MAX_FILES
+
+# Maximum number of custom images changed by a single bulk update or delete.
+BULK_CHANGE_MAX_IDS = int(os.environ.get('BULK_CHANGE_MAX_IDS', 5000))
+
+# Threads deleting files of removed images, 0 deletes them in request.
+STORAGE_CLEANUP_WORKERS = int(os.environ.get('STORAGE_CLEANUP_WORKERS', 1))
+
+# Removal of stored files no custom image references, resumed from
+# the checkpoint file. Files younger than min age seconds are kept, at
+# most rate files per second are examined, 0 leaves it unthrottled.
+STORAGE_GC_CHECKPOINT = os.environ.get('STORAGE_GC_CHECKPOINT',
+                                       '/vol/web/cache/storage-gc.json')
+STORAGE_GC_MIN_AGE = int(os.environ.get('STORAGE_GC_MIN_AGE', 3600))
+STORAGE_GC_RATE = int(os.environ.get('STORAGE_GC_RATE', 1000))
+STORAGE_GC_BATCH_SIZE = int(os.environ.get('STORAGE_GC_BATCH_SIZE', 500))
+
+# Seconds between collections run in the background of server
+# processes, one run per interval across all of them, and number of
+# files examined by each run. 0 leaves collecting to the
+# collect_storage command, e.g. run from cron.
+STORAGE_GC_INTERVAL = int(os.environ.get('STORAGE_GC_INTERVAL', 0))
+STORAGE_GC_RUN_LIMIT = int(os.environ.get('STORAGE_GC_RUN_LIMIT', 10000))
+
+# Upload handlers hashing uploaded files while they stream in.
+FILE_UPLOAD_HANDLERS = [
+    'tiers.uploadhandlers.HashingMemoryFileUploadHandler',
+    'tiers.uploadhandlers.HashingTemporaryFileUploadHandler',
+]
+
+# Let the front web server send media files: 'X-Accel-Redirect' (nginx)
+# or 'X-Sendfile' (Apache, lighttpd). Empty streams them from Django.
+MEDIA_SENDFILE_HEADER = os.environ.get('MEDIA_SENDFILE_HEADER', '')
+MEDIA_ACCEL_PREFIX = os.environ.get('MEDIA_ACCEL_PREFIX', '/protected/media/')
@@ -22,6 +22,8 @@ from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
 
+from core.views import DatabasePoolStatsView
+
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -33,6 +35,7 @@ urlpatterns = [
     ),
     path('api/user/', include('user.urls')),
     path('api/tier/', include('tiers.urls')),
+    path('api/db-stats/', DatabasePoolStatsView.as_view(), name='db-stats'),
 ]
 
 if settings.DEBUG:
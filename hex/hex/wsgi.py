@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hex.settings')
 
 application = get_wsgi_application()
+
+from tiers import storagegc  # noqa: E402
+
+storagegc.start_scheduler()
@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class TiersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'tiers'
+
+    def ready(self):
+        from PIL import Image
+        from tiers import signals  # noqa: F401
+
+        Image.MAX_IMAGE_PIXELS = settings.MAX_IMAGE_PIXELS
@@ -0,0 +1,99 @@
+"""
+Async views serving read heavy tiers endpoints under ASGI.
+"""
+from asgiref.sync import sync_to_async
+
+from django.http import Http404, JsonResponse
+from django.utils.cache import patch_vary_headers
+
+from rest_framework import exceptions, mixins
+from rest_framework.request import Request
+
+from user.authentication import CachedTokenAuthentication
+
+from tiers import delivery
+from tiers.views import CustomImagesViewSet, TierViewSet
+
+
+def _authenticate(viewset_class, request):
+    """Authenticate request with the token or session, as the sync
+        viewset does."""
+    for authentication_class in viewset_class.authentication_classes:
+        result = authentication_class().authenticate(request)
+        if result is not None:
+            return result
+    return None
+
+
+async def _get_view(viewset_class, request, action, **kwargs):
+    """Authenticate request and return viewset instance handling it."""
+    request = Request(request)
+    result = await sync_to_async(_authenticate)(viewset_class, request)
+    if result is None:
+        raise exceptions.NotAuthenticated()
+    request.user, request.auth = result
+    return viewset_class(request=request, action=action,
+                         args=(), kwargs=kwargs, format_kwarg=None)
+
+
+def _api_errors(view_func):
+    """Turn API exceptions into JSON error responses."""
+    async def wrapper(request, *args, **kwargs):
+        try:
+            return await view_func(request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            response = JsonResponse({'detail': exc.detail},
+                                    status=exc.status_code)
+            if isinstance(exc, exceptions.NotAuthenticated):
+                response['WWW-Authenticate'] = \
+                    CachedTokenAuthentication().authenticate_header(request)
+            return response
+        except Http404:
+            return JsonResponse({'detail': exceptions.NotFound.default_detail},
+                                status=exceptions.NotFound.status_code)
+    return wrapper
+
+
+def _list_data(view):
+    """Return paginated list of the view's queryset,
+        bypassing the response cache of sync views."""
+    return mixins.ListModelMixin.list(view, view.request).data
+
+
+def _retrieve_data(view):
+    """Return serialized object of the view."""
+    return view.retrieve(view.request).data
+
+
+@_api_errors
+async def tier_list(request):
+    """List tiers of authenticated user."""
+    view = await _get_view(TierViewSet, request, 'list')
+    return JsonResponse(await sync_to_async(_list_data)(view))
+
+
+@_api_errors
+async def tier_detail(request, pk):
+    """Return tier of authenticated user with its custom images."""
+    view = await _get_view(TierViewSet, request, 'retrieve', pk=pk)
+    return JsonResponse(await sync_to_async(_retrieve_data)(view))
+
+
+@_api_errors
+async def custom_images_list(request):
+    """List custom images of authenticated user."""
+    view = await _get_view(CustomImagesViewSet, request, 'list')
+    response = JsonResponse(await sync_to_async(_list_data)(view))
+    patch_vary_headers(response, ['Accept'])
+    return response
+
+
+@_api_errors
+async def custom_images_download(request, pk):
+    """Download original image or thumbnail, streaming it without
+        holding a thread for the whole transfer."""
+    view = await _get_view(CustomImagesViewSet, request, 'download', pk=pk)
+    return await sync_to_async(view.serve_download)(
+        view.request,
+        response_class=delivery.AsyncFileResponse,
+    )
@@ -0,0 +1,105 @@
+"""
+Content addressed, reference counted storage of original images.
+"""
+import hashlib
+import os
+
+from collections import Counter
+from functools import partial
+
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, When
+from django.db.models.functions import Greatest
+
+from tiers import cleanup
+from tiers.models import ImageBlob
+
+
+def blob_file_path(digest, filename):
+    """Generate file path of original image with given digest."""
+    ext = os.path.splitext(filename)[1].lower()
+    return os.path.join('uploads', 'tier', digest[:2], f'{digest}{ext}')
+
+
+def file_digest(upload):
+    """Return SHA-256 hex digest of uploaded file."""
+    sha256 = hashlib.sha256()
+    for chunk in upload.chunks():
+        sha256.update(chunk)
+    upload.seek(0)
+    return sha256.hexdigest()
+
+
+def upload_digest(upload):
+    """Return SHA-256 hex digest of uploaded file, as computed by hashing
+        upload handlers, reading the file only if it was not."""
+    return getattr(upload, 'sha256', None) or file_digest(upload)
+
+
+def _write(name, upload):
+    """Write upload under name, atomically replacing any stale file
+        an earlier blob of the same content left behind."""
+    tmp_name = default_storage.save(f'{name}.tmp', upload)
+    os.replace(default_storage.path(tmp_name), default_storage.path(name))
+
+
+def store(upload):
+    """Store uploaded original unless the same content is stored already.
+        Return its blob, with a reference taken for the caller."""
+    digest = upload_digest(upload)
+    with transaction.atomic():
+        while True:
+            try:
+                with transaction.atomic():
+                    blob = ImageBlob.objects.create(
+                        digest=digest,
+                        name=blob_file_path(digest, upload.name),
+                        size=upload.size,
+                        ref_count=1,
+                    )
+            except IntegrityError:
+                # Locks the row, so its file can't be deleted meanwhile.
+                # Nothing is updated when cleanup deleted it, retry then.
+                if ImageBlob.objects.filter(digest=digest).update(
+                    ref_count=F('ref_count') + 1
+                ):
+                    blob = ImageBlob.objects.get(digest=digest)
+                    if not default_storage.exists(blob.name):
+                        _write(blob.name, upload)
+                    return blob
+                continue
+
+            _write(blob.name, upload)
+            return blob
+
+
+def release(name):
+    """Drop one reference to original stored under name,
+        deleting the file along with the last one."""
+    release_many([name])
+
+
+def release_many(names, batch_size=500):
+    """Drop one reference per occurrence of name. Originals left
+        unreferenced are deleted, along with their blobs and thumbnails,
+        after commit unless referenced again by then."""
+    counts = Counter(name for name in names if name)
+    orphans = []
+    with transaction.atomic():
+        names = list(counts)
+        for i in range(0, len(names), batch_size):
+            batch = names[i:i + batch_size]
+            ImageBlob.objects.filter(name__in=batch).update(
+                ref_count=Greatest(
+                    Case(*[When(name=name, then=F('ref_count') - counts[name])
+                           for name in batch]),
+                    0,
+                )
+            )
+            orphans += ImageBlob.objects.filter(
+                name__in=batch,
+                ref_count=0,
+            ).values_list('name', flat=True)
+    if orphans:
+        transaction.on_commit(partial(cleanup.schedule_delete, orphans))
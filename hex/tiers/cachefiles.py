@@ -0,0 +1,26 @@
+"""
+Imagekit cache file backend for custom images specs.
+"""
+from imagekit.cachefiles.backends import CacheFileState, Simple
+
+from tiers import metrics
+from tiers.locks import file_lock
+
+
+class CoalescingBackend(Simple):
+    """Generate each cache file under a lock shared by all processes,
+        so concurrent requests for a missing file render it only once."""
+
+    def generate_now(self, file, force=False):
+        if not force and self.get_state(file) == CacheFileState.EXISTS:
+            return
+        with file_lock(file.name) as waited:
+            if not force and self._exists(file):
+                self.set_state(file, CacheFileState.EXISTS)
+                if waited:
+                    metrics.incr(metrics.COALESCED)
+                return
+            file._generate()
+            self.set_state(file, CacheFileState.EXISTS)
+            file.close()
+        metrics.incr(metrics.RENDERED)
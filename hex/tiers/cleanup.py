@@ -0,0 +1,83 @@
+"""
+Background removal of originals no custom image references anymore.
+"""
+import logging
+import os
+
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+
+from tiers.models import ImageBlob
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def delete_files(names):
+    """Delete unreferenced blobs of names, along with their originals
+        and thumbnails rendered from them. Return names deleted."""
+    deleted_names = []
+    for name in names:
+        with transaction.atomic():
+            # Waits for uploads referencing the blob again, which find
+            # it gone and write a new file once this commits.
+            deleted, _ = ImageBlob.objects.filter(name=name,
+                                                  ref_count=0).delete()
+            if deleted:
+                _delete_files(name)
+                deleted_names.append(name)
+    return deleted_names
+
+
+def _delete_files(name):
+    """Delete original along with thumbnails rendered from it."""
+    default_storage.delete(name)
+    # Cache files of a source live in a directory named after it.
+    thumbnails_dir = os.path.join(settings.IMAGEKIT_CACHEFILE_DIR,
+                                  os.path.splitext(name)[0])
+    try:
+        dirs, files = default_storage.listdir(thumbnails_dir)
+    except FileNotFoundError:
+        return
+    for filename in files:
+        default_storage.delete(os.path.join(thumbnails_dir, filename))
+
+
+def _delete_in_worker(names):
+    """Delete files, closing connection of the worker thread after."""
+    try:
+        delete_files(names)
+    finally:
+        connections.close_all()
+
+
+def _get_executor():
+    """Return the thread pool, creating it on first use."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.STORAGE_CLEANUP_WORKERS,
+        )
+    return _executor
+
+
+def _log_failure(future):
+    """Log errors raised while deleting files."""
+    exc = future.exception()
+    if exc is not None:
+        logger.error('Deleting files failed: %r', exc)
+
+
+def schedule_delete(names):
+    """Hand deleting files off to the worker pool.
+        Deletes inline when no workers are configured."""
+    if not settings.STORAGE_CLEANUP_WORKERS:
+        delete_files(names)
+        return
+    future = _get_executor().submit(_delete_in_worker, list(names))
+    future.add_done_callback(_log_failure)
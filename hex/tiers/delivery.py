@@ -0,0 +1,151 @@
+"""
+Delivery of stored image files.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class FileRange:
+    """File limited to a byte range, still exposing fileno()
+        so WSGI servers can send it with os.sendfile."""
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+class AsyncFileResponse(FileResponse):
+    """File response our ASGI handler streams reading the file in worker
+        threads, so a slow client holds no thread while it waits."""
+
+    async def aiter_content(self):
+        read = sync_to_async(self.file_to_stream.read,
+                             thread_sensitive=False)
+        while True:
+            chunk = await read(self.block_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def file_etag(name):
+    """Strong ETag of stored file. Stored files are never overwritten,
+        a new content always gets a new name."""
+    return '"%s"' % hashlib.sha256(name.encode()).hexdigest()
+
+
+def parse_range(header, size):
+    """Return (start, end) of a single byte range, None when the whole
+        file should be sent. Raise ValueError if range is unsatisfiable."""
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    start, end = match.groups()
+    if not start:
+        if not end:
+            return None
+        suffix = int(end)
+        if suffix == 0:
+            raise ValueError('Empty suffix range.')
+        return max(size - suffix, 0), size - 1
+
+    start = int(start)
+    if start >= size:
+        raise ValueError('Range starts after end of file.')
+    end = int(end) if end else size - 1
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+def _sendfile_response(name, path, content_type):
+    """Leave sending the file to the front web server."""
+    header = settings.MEDIA_SENDFILE_HEADER
+    response = HttpResponse(content_type=content_type)
+    if header == 'X-Accel-Redirect':
+        response[header] = settings.MEDIA_ACCEL_PREFIX + name
+    else:
+        response[header] = path
+    return response
+
+
+def _file_response(request, path, size, etag, content_type,
+                   response_class):
+    """Stream the file, honouring a single byte Range."""
+    byte_range = None
+    range_header = request.META.get('HTTP_RANGE')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if range_header and (if_range is None or if_range == etag):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    image_file = open(path, 'rb')
+    if byte_range is None:
+        return response_class(image_file, content_type=content_type)
+
+    start, end = byte_range
+    length = end - start + 1
+    response = response_class(FileRange(image_file, start, length),
+                              status=206,
+                              content_type=content_type)
+    response['Content-Length'] = length
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
+
+
+def serve_file(request, name, etag=None, response_class=FileResponse):
+    """Return response sending stored file, with conditional GET,
+        Range and optional X-Accel-Redirect / X-Sendfile support."""
+    try:
+        path = default_storage.path(name)
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise Http404
+
+    etag = etag or file_etag(name)
+    last_modified = int(stat.st_mtime)
+    response = get_conditional_response(request,
+                                        etag=etag,
+                                        last_modified=last_modified)
+    if response is None:
+        content_type = (mimetypes.guess_type(name)[0]
+                        or 'application/octet-stream')
+        if settings.MEDIA_SENDFILE_HEADER:
+            response = _sendfile_response(name, path, content_type)
+        else:
+            response = _file_response(request, path, stat.st_size,
+                                      etag, content_type, response_class)
+        response['Last-Modified'] = http_date(last_modified)
+        response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    return response
@@ -0,0 +1,33 @@
+"""
+Thumbnail formats negotiated with clients.
+"""
+from copy import copy
+
+from imagekit.cachefiles import ImageCacheFile
+from PIL import features
+
+WEBP = 'WEBP'
+JPEG = 'JPEG'
+EXTENSIONS = {WEBP: 'webp', JPEG: 'jpg'}
+
+# JPEG is the fallback every client understands.
+FORMATS = [JPEG, WEBP] if features.check('webp') else [JPEG]
+
+
+def negotiate(request):
+    """Return best thumbnail format accepted by the client."""
+    if request is None or WEBP not in FORMATS:
+        return JPEG
+    if 'image/webp' in request.META.get('HTTP_ACCEPT', ''):
+        return WEBP
+    return JPEG
+
+
+def variant(cachefile, format):
+    """Return cache file of the same spec encoded in another format,
+        its name, and so its cache key, differs per format."""
+    if (cachefile.generator.format or '').upper() == format:
+        return cachefile
+    generator = copy(cachefile.generator)
+    generator.format = format
+    return ImageCacheFile(generator)
@@ -0,0 +1,46 @@
+"""
+Signed, expiring links to custom images.
+"""
+import time
+
+from django.core import signing
+
+SALT = 'tiers.expiring-link'
+ORIGINAL = 'image'
+
+
+class LinkExpired(signing.BadSignature):
+    """Signature was valid but the link expired."""
+    pass
+
+
+def _file_name(custom_img, spec):
+    """Return storage name of the original image or a thumbnail spec."""
+    if spec == ORIGINAL:
+        return custom_img.image.name
+    return getattr(custom_img, spec).name
+
+
+def make_token(custom_img, seconds, spec=ORIGINAL):
+    """Return token granting access to image file for given seconds."""
+    return sign(custom_img.id, _file_name(custom_img, spec), seconds, spec)
+
+
+def sign(custom_image_id, name, seconds, spec=ORIGINAL):
+    """Return token granting access to stored file for given seconds."""
+    payload = {
+        'id': custom_image_id,
+        'spec': spec,
+        'name': name,
+        'exp': int(time.time()) + seconds,
+    }
+    return signing.dumps(payload, salt=SALT, compress=True)
+
+
+def load_token(token):
+    """Return payload of a valid token, without touching the database.
+        Raises BadSignature for tampered and LinkExpired for old tokens."""
+    payload = signing.loads(token, salt=SALT)
+    if payload['exp'] < time.time():
+        raise LinkExpired('Link expired.')
+    return payload
@@ -0,0 +1,118 @@
+"""
+Cache of rendered list responses, keyed on a per-user version counter
+bumped whenever tiers or custom images of the user change.
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.forms.models import model_to_dict
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+
+from tiers import plans
+
+VERSION_PREFIX = 'tiers:list-version:'
+RESPONSE_PREFIX = 'tiers:list:'
+
+
+def _cache():
+    return caches[settings.LIST_CACHE_ALIAS]
+
+
+def get_version(user_id):
+    """Return version of the user's lists, starting from a value
+        that was never used when the counter is missing."""
+    key = VERSION_PREFIX + str(user_id)
+    _cache().add(key, time.time_ns(), timeout=None)
+    return _cache().get(key)
+
+
+def _incr(user_id):
+    key = VERSION_PREFIX + str(user_id)
+    try:
+        _cache().incr(key)
+    except ValueError:
+        _cache().set(key, time.time_ns(), timeout=None)
+
+
+def bump(user_id):
+    """Invalidate cached lists of the user, now and again after commit,
+        so lists cached meanwhile from not yet committed data are
+        not served either."""
+    _incr(user_id)
+    transaction.on_commit(lambda: _incr(user_id))
+
+
+class CachedListMixin:
+    """Serve list action from the response cache, answering 304
+        to clients which already have the current list."""
+
+    def _list_cache_key(self, request):
+        user = request.user
+        # Plan's values, not only its code, so lists follow plan changes
+        # as soon as the process reloads plans.
+        plan = model_to_dict(plans.get_plan(user.account_plan))
+        # Clock bucket makes lists with expiring links expire as well.
+        variant = '\n'.join([
+            self.basename,
+            str(user.pk),
+            json.dumps(plan, sort_keys=True, default=str),
+            str(get_version(user.pk)),
+            str(int(time.time() // settings.LIST_CACHE_TTL)),
+            request.build_absolute_uri(),
+            request.META.get('HTTP_ACCEPT', ''),
+        ])
+        return RESPONSE_PREFIX + hashlib.sha256(variant.encode()).hexdigest()
+
+    def _list_etag(self):
+        return '"%s"' % self.list_cache_key[len(RESPONSE_PREFIX):]
+
+    def list(self, request, *args, **kwargs):
+        if not settings.LIST_CACHE_TTL:
+            return super().list(request, *args, **kwargs)
+
+        self.list_cache_key = self._list_cache_key(request)
+        # Answer 304 only while the list is cached, entries holding
+        # expiring links are kept shorter than the clock bucket.
+        cached = _cache().get(self.list_cache_key)
+        if cached is None:
+            return super().list(request, *args, **kwargs)
+        etag = self._list_etag()
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
+        response['ETag'] = etag
+        return response
+
+    @staticmethod
+    def _list_cache_ttl(data):
+        """Return seconds rendered list may be cached, at most half
+            the lifetime of the shortest expiring link it holds."""
+        rows = data.get('results', []) if isinstance(data, dict) else data
+        ttl = settings.LIST_CACHE_TTL
+        for row in rows:
+            if isinstance(row, dict) and row.get('expiring_link'):
+                ttl = min(ttl, row['expiring_link_val'] // 2)
+        return ttl
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response,
+                                             *args, **kwargs)
+        if getattr(self, 'list_cache_key', None):
+            patch_vary_headers(response, ['Accept', 'Authorization'])
+            if (response.status_code == 200
+                    and getattr(response, 'accepted_renderer', None)
+                    and response.accepted_renderer.format == 'json'):
+                response.render()
+                response['ETag'] = self._list_etag()
+                ttl = self._list_cache_ttl(response.data)
+                if ttl > 0:
+                    _cache().set(self.list_cache_key,
+                                 (response.content, response['Content-Type']),
+                                 timeout=ttl)
+        return response
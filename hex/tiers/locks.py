@@ -0,0 +1,53 @@
+"""
+Locks shared by every process of the host.
+"""
+import fcntl
+import hashlib
+import os
+
+from contextlib import contextmanager
+
+from django.conf import settings
+
+
+@contextmanager
+def file_lock(key):
+    """Hold exclusive lock on key, yield whether another process
+        held it first and had to be waited for. Keys hashing to the same
+        lock file wait for each other too."""
+    os.makedirs(settings.RENDER_LOCK_DIR, exist_ok=True)
+    # Keys share a fixed set of lock files, so the directory never grows.
+    digest = hashlib.sha256(key.encode()).digest()
+    slot = int.from_bytes(digest[:8], 'big') % settings.RENDER_LOCK_SLOTS
+    path = os.path.join(settings.RENDER_LOCK_DIR, f'{slot}.lock')
+
+    with open(path, 'a') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            waited = False
+        except BlockingIOError:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            waited = True
+        try:
+            yield waited
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+@contextmanager
+def try_file_lock(name):
+    """Hold exclusive lock named name unless another process holds it,
+        yield whether it was acquired."""
+    os.makedirs(settings.RENDER_LOCK_DIR, exist_ok=True)
+    path = os.path.join(settings.RENDER_LOCK_DIR, f'{name}.lock')
+
+    with open(path, 'a') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
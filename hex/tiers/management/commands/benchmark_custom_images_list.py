@@ -0,0 +1,79 @@
+"""
+Django command comparing custom images list rendering paths.
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from tiers import fastlist, plans
+from tiers.models import CustomImages, RenderedThumbnail
+
+
+def _create_rows(user, count, specs):
+    """Create custom images with rendered thumbnails index."""
+    CustomImages.objects.bulk_create([
+        CustomImages(user=user,
+                     name=f'Image{i:06}',
+                     image=f'uploads/tier/{i:064x}.jpg',
+                     thumbnails_ready=True,
+                     expiring_link_val=300)
+        for i in range(count)
+    ], batch_size=1000)
+    RenderedThumbnail.objects.bulk_create([
+        RenderedThumbnail(custom_image=custom_img,
+                          spec=spec,
+                          name=getattr(custom_img, spec).name)
+        for custom_img in CustomImages.objects.filter(user=user)
+        for spec in specs
+    ], batch_size=1000)
+
+
+class Command(BaseCommand):
+    """Django command benchmarking custom images list rendering."""
+    help = 'Compare rows/sec of plan serializers and the fast list path.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--plans', nargs='+', default=['bp', 'pp', 'ep'])
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        request = Request(APIRequestFactory().get('/'))
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(
+                email='benchmark@example.com',
+                password=None,
+            )
+            specs = {spec for code in options['plans']
+                     for spec in plans.thumbnail_specs(plans.get_plan(code))}
+            _create_rows(user, options['rows'], specs)
+            queryset = CustomImages.objects.filter(user=user) \
+                .order_by('-name', '-id')
+
+            for code in options['plans']:
+                plan = plans.get_plan(code)
+
+                start = time.perf_counter()
+                serializer_class = plans.serializer_for_plan(code)
+                serializer_class(queryset.prefetch_related('thumbnails'),
+                                 many=True,
+                                 context={'request': request}).data
+                before = time.perf_counter() - start
+
+                start = time.perf_counter()
+                fastlist.CustomImagesRows(plan, request).render(
+                    list(queryset.values(*fastlist.COLUMNS))
+                )
+                after = time.perf_counter() - start
+
+                self.stdout.write(
+                    f'{code} {options["rows"] / before:10.0f} rows/s'
+                    f' -> {options["rows"] / after:10.0f} rows/s'
+                    f' ({before / after:.1f}x)'
+                )
+            transaction.set_rollback(True)
@@ -0,0 +1,75 @@
+"""
+Django command comparing JSON renderers on custom images list payloads.
+"""
+import time
+
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer, orjson
+
+MEDIA_URL = 'http://localhost:8000/static/media/'
+
+
+def _payload(rows):
+    """Return custom images list page as built for enterprise plan."""
+    return {
+        'next': 'http://localhost:8000/api/tier/custom_images/?cursor=eyJy',
+        'previous': None,
+        'results': [{
+            'id': i,
+            'name': f'Image{i:06}',
+            'link_200px': f'{MEDIA_URL}CACHE/images/uploads/tier/'
+                          f'{i:064x}/ef7dbffc751755d5f90f6b7abc403a32.jpg',
+            'link_400px': f'{MEDIA_URL}CACHE/images/uploads/tier/'
+                          f'{i:064x}/04d492f729aecf28063b253480290263.jpg',
+            'expiring_link_val': 300,
+            'expiring_link': 'http://localhost:8000/api/tier/expiring/'
+                             f'{i:0120x}/',
+        } for i in range(rows)],
+    }
+
+
+def _best_of(repeat, func):
+    """Return shortest of repeated timings of func."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+class Command(BaseCommand):
+    """Django command benchmarking JSON renderers and parsers."""
+    help = 'Compare stdlib and orjson rendering of large list payloads.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if orjson is None:
+            self.stderr.write('orjson is not installed, both paths'
+                              ' use the stdlib json module.')
+        data = _payload(options['rows'])
+        content = JSONRenderer().render(data)
+        self.stdout.write(f'payload {len(content)} bytes')
+
+        for name, stdlib, fast in [
+            ('render', lambda: JSONRenderer().render(data),
+             lambda: FastJSONRenderer().render(data)),
+            ('parse', lambda: JSONParser().parse(BytesIO(content)),
+             lambda: FastJSONParser().parse(BytesIO(content))),
+        ]:
+            before = _best_of(options['repeat'], stdlib)
+            after = _best_of(options['repeat'], fast)
+            self.stdout.write(
+                f'{name:6} {before * 1000:8.1f} ms -> {after * 1000:8.1f} ms'
+                f' ({before / after:.1f}x)'
+            )
@@ -0,0 +1,81 @@
+"""
+Django command load testing WSGI and ASGI serving of the tiers API.
+"""
+import statistics
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Sync endpoint and its async counterpart, relative to the tiers API root.
+ENDPOINTS = [
+    ('tiers/', 'async/tiers/'),
+    ('custom_images/', 'async/custom_images/'),
+    ('custom_images/{image}/download/',
+     'async/custom_images/{image}/download/'),
+]
+
+
+def _fetch(base_url, path, token, read_delay):
+    """Request path like a slow client, return seconds it took."""
+    url = urlsplit(base_url)
+    connection = HTTPConnection(url.hostname, url.port or 80, timeout=60)
+    start = time.perf_counter()
+    try:
+        connection.request('GET', url.path.rstrip('/') + '/' + path,
+                           headers={'Authorization': f'Token {token}'})
+        response = connection.getresponse()
+        if response.status >= 400:
+            raise CommandError(f'GET {path} returned {response.status}.')
+        while response.read(16 * 1024):
+            time.sleep(read_delay)
+    finally:
+        connection.close()
+    return time.perf_counter() - start
+
+
+class Command(BaseCommand):
+    """Django command benchmarking sync and async views."""
+    help = 'Compare latency and throughput of WSGI and ASGI servers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wsgi', required=True,
+                            help='Tiers API root served by WSGI, e.g.'
+                                 ' http://localhost:8000/api/tier/')
+        parser.add_argument('--asgi', required=True,
+                            help='Tiers API root served by ASGI, e.g.'
+                                 ' http://localhost:8001/api/tier/')
+        parser.add_argument('--token', required=True,
+                            help='Auth token of the benchmarked user.')
+        parser.add_argument('--image', type=int, required=True,
+                            help='Id of custom image to download.')
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--read-delay', type=float, default=0.01,
+                            help='Seconds slow clients wait between reads.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        for sync_path, async_path in ENDPOINTS:
+            for server, path in [('wsgi', sync_path), ('asgi', async_path)]:
+                path = path.format(image=options['image'])
+                with ThreadPoolExecutor(options['concurrency']) as pool:
+                    start = time.perf_counter()
+                    timings = list(pool.map(
+                        lambda i: _fetch(options[server], path,
+                                         options['token'],
+                                         options['read_delay']),
+                        range(options['requests']),
+                    ))
+                    elapsed = time.perf_counter() - start
+                timings.sort()
+                p95 = timings[int(len(timings) * 0.95) - 1]
+                self.stdout.write(
+                    f'{server} {path:40}'
+                    f' {len(timings) / elapsed:8.1f} req/s'
+                    f' p50 {statistics.median(timings) * 1000:8.1f} ms'
+                    f' p95 {p95 * 1000:8.1f} ms'
+                )
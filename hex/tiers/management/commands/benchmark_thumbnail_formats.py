@@ -0,0 +1,62 @@
+"""
+Django command comparing size and encode time of thumbnail formats.
+"""
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from imagekit.processors import Resize
+from pilkit.utils import process_image
+
+from tiers import formats
+
+SIZES = [(200, 200), (400, 400)]
+
+
+def _sample_images(corpus):
+    """Yield images of corpus directory, or synthetic photos without one."""
+    if corpus:
+        for filename in sorted(os.listdir(corpus)):
+            path = os.path.join(corpus, filename)
+            if os.path.splitext(filename)[1].lower() in ('.jpg', '.png'):
+                yield Image.open(path)
+        return
+    for i in range(10):
+        img = Image.effect_mandelbrot((1600, 1200),
+                                      (-2 + i * 0.05, -1.2, 1, 1.2), 100)
+        yield Image.merge('RGB', [img, img.rotate(90, expand=False),
+                                  img.transpose(Image.FLIP_LEFT_RIGHT)])
+
+
+class Command(BaseCommand):
+    """Django command benchmarking thumbnail formats."""
+    help = 'Compare bytes and encode time of PNG and negotiated formats.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--corpus',
+                            help='Directory with sample jpg/png images.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        candidates = ['PNG'] + formats.FORMATS
+        totals = {format: [0, 0.0] for format in candidates}
+
+        for img in _sample_images(options['corpus']):
+            img.load()
+            for size in SIZES:
+                resized = Resize(*size).process(img)
+                for format in candidates:
+                    start = time.perf_counter()
+                    content = process_image(resized, format=format,
+                                            options={'quality': 70})
+                    totals[format][1] += time.perf_counter() - start
+                    totals[format][0] += len(content.getvalue())
+
+        png_bytes, png_seconds = totals['PNG']
+        for format, (size, seconds) in totals.items():
+            self.stdout.write(
+                f'{format:5} {size:>12} bytes ({size / png_bytes:6.1%})'
+                f' {seconds * 1000:10.1f} ms ({seconds / png_seconds:6.1%})'
+            )
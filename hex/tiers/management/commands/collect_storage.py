@@ -0,0 +1,54 @@
+"""
+Django command deleting stored files no custom image references.
+"""
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from tiers.storagegc import Collector
+
+
+class Command(BaseCommand):
+    """Django command collecting orphaned originals and thumbnails."""
+    help = ('Delete originals and thumbnails no custom image references,'
+            ' continuing from where the previous run stopped.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=None,
+                            help='Stop after examining this many files.')
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--rate', type=int, default=None,
+                            help='Files examined per second, 0 for'
+                                 ' no limit.')
+        parser.add_argument('--min-age', type=int, default=None,
+                            help='Keep files younger than this many'
+                                 ' seconds.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report files without deleting them.'
+                                 ' Thumbnails of orphaned originals are'
+                                 ' not reported.')
+        parser.add_argument('--restart', action='store_true',
+                            help='Discard checkpoint of previous run.')
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if options['restart'] and not options['dry_run']:
+            try:
+                os.remove(settings.STORAGE_GC_CHECKPOINT)
+            except FileNotFoundError:
+                pass
+
+        report = Collector(
+            batch_size=options['batch_size'],
+            rate=options['rate'],
+            min_age=options['min_age'],
+            dry_run=options['dry_run'],
+        ).run(limit=options['limit'])
+
+        if report.skipped:
+            self.stderr.write('Another process is collecting, try later.')
+            return
+        self.stdout.write(str(report).capitalize())
+        if not report.finished:
+            self.stdout.write('Checkpoint saved, run again to continue.')
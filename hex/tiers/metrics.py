@@ -0,0 +1,27 @@
+"""
+Counters of thumbnail rendering, kept in the Django cache so they are
+shared by processes whenever the cache backend is.
+"""
+from django.core.cache import cache
+
+PREFIX = 'tiers:metrics:'
+RENDERED = 'rendered'
+COALESCED = 'coalesced'
+
+
+def incr(name):
+    """Increase counter by one."""
+    key = PREFIX + name
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add and incr.
+        cache.set(key, 1, timeout=None)
+
+
+def snapshot():
+    """Return current value of all counters."""
+    names = [RENDERED, COALESCED]
+    values = cache.get_many([PREFIX + name for name in names])
+    return {name: values.get(PREFIX + name, 0) for name in names}
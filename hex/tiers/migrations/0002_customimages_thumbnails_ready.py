@@ -0,0 +1,24 @@
+# Generated by Django 4.0.5 on 2022-06-20 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tiers', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customimages',
+            name='thumbnails_ready',
+            field=models.BooleanField(default=True),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='customimages',
+            name='thumbnails_ready',
+            field=models.BooleanField(default=False),
+        ),
+    ]
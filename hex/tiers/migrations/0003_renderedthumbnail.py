@@ -0,0 +1,23 @@
+# Generated by Django 4.0.10 on 2026-10-18 13:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tiers', '0002_customimages_thumbnails_ready'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RenderedThumbnail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('spec', models.CharField(max_length=255)),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('custom_image', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='thumbnails', to='tiers.customimages')),
+            ],
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.0.10 on 2026-10-18 13:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tiers', '0003_renderedthumbnail'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customimages',
+            index=models.Index(fields=['user', 'name', 'id'], name='customimages_user_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tier',
+            index=models.Index(fields=['user', 'id'], name='tier_user_id_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.0.10 on 2026-10-18 13:21
+
+from django.db import migrations, models
+
+
+DEFAULT_PLANS = [
+    {'code': 'bp', 'name': 'Basic', 'thumbnail_sizes': [200]},
+    {'code': 'pp', 'name': 'Premium', 'thumbnail_sizes': [200, 400],
+     'original_image': True},
+    {'code': 'ep', 'name': 'Enterprise', 'thumbnail_sizes': [200, 400],
+     'expiring_link': True},
+    {'code': 'ap', 'name': 'Admin', 'original_image': True,
+     'custom_thumbnail': True},
+]
+
+
+def create_default_plans(apps, schema_editor):
+    AccountPlan = apps.get_model('tiers', 'AccountPlan')
+    AccountPlan.objects.bulk_create(
+        [AccountPlan(**plan) for plan in DEFAULT_PLANS]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tiers', '0004_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountPlan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=2, unique=True)),
+                ('name', models.CharField(max_length=255)),
+                ('thumbnail_sizes', models.JSONField(blank=True, default=list)),
+                ('original_image', models.BooleanField(default=False)),
+                ('expiring_link', models.BooleanField(default=False)),
+                ('custom_thumbnail', models.BooleanField(default=False)),
+            ],
+        ),
+        migrations.RunPython(create_default_plans,
+                             migrations.RunPython.noop),
+    ]
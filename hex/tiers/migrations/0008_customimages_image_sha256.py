@@ -0,0 +1,18 @@
+# Generated by Django 4.0.10 on 2026-10-18 13:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tiers', '0007_image_blobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customimages',
+            name='image_sha256',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
@@ -4,6 +4,7 @@ import os
 
 from django.db import models
 from django.conf import settings
+from django.core.files.storage import default_storage
 from django.core.validators import FileExtensionValidator
 
 from imagekit import ImageSpec, register
@@ -11,6 +12,9 @@ from imagekit.models import ImageSpecField
 from imagekit.processors import Resize
 from imagekit.utils import get_field_info
 
+from pilkit.processors.utils import resolve_palette
+from pilkit.utils import open_image, process_image
+
 
 def tier_image_file_path(instance, filename):
     """Generate file path for new tier image."""
@@ -20,6 +24,31 @@ def tier_image_file_path(instance, filename):
     return os.path.join('uploads', 'tier', filename)
 
 
+class AccountPlan(models.Model):
+    """Account plan, describing what its users get for their images."""
+    code = models.CharField(max_length=2, unique=True)
+    name = models.CharField(max_length=255)
+    thumbnail_sizes = models.JSONField(default=list, blank=True)
+    original_image = models.BooleanField(default=False)
+    expiring_link = models.BooleanField(default=False)
+    custom_thumbnail = models.BooleanField(default=False)
+    max_pixels = models.PositiveBigIntegerField(blank=True, null=True)
+
+    def __str__(self):
+        return self.name
+
+
+class ImageBlob(models.Model):
+    """Original image stored once per content, shared by custom images."""
+    digest = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return self.name
+
+
 class Tier(models.Model):
     """Tier object."""
     user = models.ForeignKey(
@@ -30,12 +59,20 @@ class Tier(models.Model):
     description = models.TextField(blank=True)
     custom_images = models.ManyToManyField('CustomImages')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'id'], name='tier_user_id_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
 
 class AvatarThumbnail(ImageSpec):
     """Get model imageField source file and custom link heights and widths."""
+    format = 'JPEG'
+    options = {'quality': 70}
+
     @property
     def processors(self):
         model, field_name = get_field_info(self.source)
@@ -46,6 +83,64 @@ class AvatarThumbnail(ImageSpec):
 register.generator('tiers:customimages:custom_link', AvatarThumbnail)
 
 
+class MultiSizeThumbnail(ImageSpec):
+    """Decode source file once and render all requested sizes from it."""
+    format = 'JPEG'
+    options = {'quality': 70}
+
+    def __init__(self, source, sizes=()):
+        self.sizes = sorted(set(sizes), reverse=True)
+        super().__init__(source)
+
+    @property
+    def processors(self):
+        return [Resize(width, height) for width, height in self.sizes]
+
+    def _decode(self):
+        """Decode source no larger than needed for the biggest size."""
+        max_width = max(width for width, height in self.sizes)
+        max_height = max(height for width, height in self.sizes)
+
+        img = open_image(self.source)
+        if img.format == 'JPEG':
+            img.draft('RGB', (max_width, max_height))
+        img = resolve_palette(img)
+
+        factor = min(img.width // max_width, img.height // max_height)
+        if factor >= 2:
+            return img.reduce(factor)
+        img.load()
+        return img
+
+    def generate_all(self, formats=None):
+        """Return rendered file for every size and format,
+            keyed by (size, format)."""
+        formats = formats or [self.format]
+        closed = self.source.closed
+        if closed:
+            self.source.open()
+        try:
+            img = self._decode()
+        finally:
+            if closed:
+                self.source.close()
+
+        rendered = {}
+        for size in self.sizes:
+            resized = Resize(*size).process(img)
+            for format in formats:
+                rendered[size, format] = process_image(resized,
+                                                       format=format,
+                                                       options=self.options)
+        return rendered
+
+    def generate(self):
+        return self.generate_all()[self.sizes[0], self.format]
+
+
+register.generator('tiers:customimages:thumbnails', MultiSizeThumbnail)
+
+
 class CustomImages(models.Model):
     """Custom image for filtering tiers."""
     name = models.CharField(max_length=255)
@@ -62,12 +157,12 @@ class CustomImages(models.Model):
 
     link_200px = ImageSpecField(source='image',
                                 processors=[Resize(200, 200)],
-                                format='PNG',
+                                format='JPEG',
                                 options={'quality': 70})
 
     link_400px = ImageSpecField(source='image',
                                 processors=[Resize(400, 400)],
-                                format='PNG',
+                                format='JPEG',
                                 options={'quality': 70})
 
     expiring_link_val = models.PositiveIntegerField(blank=True,
@@ -86,8 +181,43 @@ class CustomImages(models.Model):
 
     custom_link = ImageSpecField(source='image',
                                  id='tiers:customimages:custom_link',
-                                 format='png',
+                                 format='JPEG',
                                  options={'quality': 70})
 
+    thumbnails_ready = models.BooleanField(default=False)
+    """Image metadata read from header on upload."""
+    image_width = models.PositiveIntegerField(blank=True, null=True)
+    image_height = models.PositiveIntegerField(blank=True, null=True)
+    image_format = models.CharField(max_length=10, blank=True)
+    image_bytes = models.PositiveBigIntegerField(blank=True, null=True)
+    image_sha256 = models.CharField(max_length=64, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'name', 'id'],
+                         name='customimages_user_name_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class RenderedThumbnail(models.Model):
+    """Index of thumbnail cache files rendered for custom images."""
+    custom_image = models.ForeignKey(
+        CustomImages,
+        on_delete=models.CASCADE,
+        related_name='thumbnails',
+    )
+    spec = models.CharField(max_length=255)
+    name = models.CharField(max_length=255)
+
+    class Meta:
+        unique_together = ['custom_image', 'name']
+
+    @property
+    def url(self):
+        return default_storage.url(self.name)
+
     def __str__(self):
         return self.name
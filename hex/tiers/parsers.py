@@ -0,0 +1,18 @@
+"""
+Parsers for tiers API.
+"""
+from rest_framework.parsers import MultiPartParser
+
+from tiers.uploadhandlers import HashingTemporaryFileUploadHandler
+
+
+class StreamingMultiPartParser(MultiPartParser):
+    """Multipart parser spooling every uploaded file straight to disk,
+        so large bulk uploads are never buffered in memory."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = parser_context['request']
+        request.upload_handlers = [
+            HashingTemporaryFileUploadHandler(request._request),
+        ]
+        return super().parse(stream, media_type, parser_context)
@@ -0,0 +1,80 @@
+"""
+Registry of account plans, cached in process.
+"""
+import threading
+import time
+
+from django.conf import settings
+
+from tiers import links
+from tiers.models import AccountPlan, CustomImages
+from tiers.serializers import build_custom_images_serializer
+
+# Plan of users whose account_plan is not registered.
+FALLBACK_PLAN = 'ap'
+
+_lock = threading.Lock()
+_plans = None
+_expires = 0
+_serializers = {}
+
+
+def clear_cache():
+    """Forget loaded plans and serializers built for them."""
+    global _plans
+    with _lock:
+        _plans = None
+        _serializers.clear()
+
+
+def get_plans():
+    """Return all plans by code, loading them when needed."""
+    global _plans, _expires
+    with _lock:
+        if _plans is None or _expires < time.monotonic():
+            _plans = {plan.code: plan for plan in AccountPlan.objects.all()}
+            _expires = time.monotonic() + settings.ACCOUNT_PLAN_CACHE_TTL
+            _serializers.clear()
+        return _plans
+
+
+def get_plan(code):
+    """Return plan for account_plan code of a user."""
+    if not code:
+        raise ValueError("account_plan for images can't be blank")
+    plans = get_plans()
+    plan = plans.get(code) or plans.get(FALLBACK_PLAN)
+    if plan is None:
+        raise ValueError(f'Unknown account_plan {code}')
+    return plan
+
+
+def thumbnail_specs(plan):
+    """Return thumbnail specs the plan is entitled to. Sizes without
+        a spec field are only served as dynamic thumbnails."""
+    specs = [f'link_{size}px' for size in plan.thumbnail_sizes
+             if hasattr(CustomImages, f'link_{size}px')]
+    if plan.custom_thumbnail:
+        specs.append('custom_link')
+    return specs
+
+
+def downloadable_specs(plan):
+    """Return specs, original image included, the plan can download."""
+    specs = thumbnail_specs(plan)
+    if plan.original_image or plan.expiring_link:
+        specs.append(links.ORIGINAL)
+    return specs
+
+
+def serializer_for_plan(code):
+    """Return custom images serializer class for account_plan code,
+        built once per plan."""
+    plan = get_plan(code)
+    serializer_class = _serializers.get(plan.code)
+    if serializer_class is None:
+        serializer_class = build_custom_images_serializer(
+            plan, thumbnail_specs(plan)
+        )
+        _serializers[plan.code] = serializer_class
+    return serializer_class
@@ -0,0 +1,115 @@
+"""
+Background rendering of custom images thumbnails.
+"""
+import logging
+import multiprocessing
+
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+
+from django.conf import settings
+
+from imagekit.cachefiles.backends import CacheFileState
+from imagekit.registry import generator_registry
+
+from tiers import formats, listcache, plans
+from tiers.locks import file_lock
+from tiers.models import CustomImages, RenderedThumbnail
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def spec_size(cachefile):
+    """Return size rendered by the spec, None if it has no size yet."""
+    resize = cachefile.generator.processors[-1]
+    if not (resize.width and resize.height):
+        return None
+    return resize.width, resize.height
+
+
+def render_thumbnails(custom_image_id):
+    """Render every thumbnail the owner's account plan is entitled to."""
+    try:
+        custom_img = CustomImages.objects.select_related('user').get(
+            pk=custom_image_id
+        )
+    except CustomImages.DoesNotExist:
+        return
+    if not custom_img.image:
+        return
+
+    targets = []
+    plan = plans.get_plan(custom_img.user.account_plan)
+    for spec in plans.thumbnail_specs(plan):
+        cachefile = getattr(custom_img, spec)
+        size = spec_size(cachefile)
+        if size is None:
+            continue
+        for format in formats.FORMATS:
+            targets.append((spec, formats.variant(cachefile, format),
+                            (size, format)))
+
+    if targets:
+        generator = generator_registry.get(
+            'tiers:customimages:thumbnails',
+            source=custom_img.image,
+            sizes={size for spec, cachefile, (size, format) in targets},
+        )
+        rendered = generator.generate_all(formats.FORMATS)
+        for spec, cachefile, key in targets:
+            with file_lock(cachefile.name):
+                if not cachefile.storage.exists(cachefile.name):
+                    cachefile.storage.save(cachefile.name, rendered[key])
+            cachefile.cachefile_backend.set_state(cachefile,
+                                                  CacheFileState.EXISTS)
+        RenderedThumbnail.objects.bulk_create(
+            [RenderedThumbnail(custom_image=custom_img,
+                               spec=spec,
+                               name=cachefile.name)
+             for spec, cachefile, key in targets],
+            ignore_conflicts=True,
+        )
+
+    # Source could have been replaced while rendering, its own job
+    # is responsible for marking it ready then.
+    updated = CustomImages.objects.filter(
+        pk=custom_img.pk,
+        image=custom_img.image.name,
+    ).update(thumbnails_ready=True)
+    if updated:
+        listcache.bump(custom_img.user_id)
+
+
+def _get_executor():
+    """Return the process pool, creating it on first use. Workers are
+        spawned, never forked, so they share no database connections,
+        nor locks held by other threads, with the server process."""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.THUMBNAIL_RENDER_WORKERS,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=django.setup,
+        )
+    return _executor
+
+
+def _log_failure(future):
+    """Log errors raised inside worker processes."""
+    exc = future.exception()
+    if exc is not None:
+        logger.error('Rendering thumbnails failed: %r', exc)
+
+
+def schedule_render(custom_image_id):
+    """Hand rendering of custom image thumbnails off to the worker pool.
+        Renders inline when no workers are configured."""
+    if not settings.THUMBNAIL_RENDER_WORKERS:
+        render_thumbnails(custom_image_id)
+        return
+    future = _get_executor().submit(render_thumbnails, custom_image_id)
+    future.add_done_callback(_log_failure)
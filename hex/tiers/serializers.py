@@ -1,14 +1,45 @@
 """
 Serializers for tiers API.
 """
+from django.conf import settings
+from django.urls import reverse
+
 from rest_framework import serializers
 
+from tiers import blobs, links
 from tiers.models import (
     Tier,
     CustomImages,
 )
 
 
+class ThumbnailField(serializers.ImageField):
+    """Thumbnail link in the spec's own format, the same for every
+        client, pending until background rendering is done. Download
+        endpoints serve WebP to clients accepting it."""
+    PENDING = 'pending'
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        if instance.image and not instance.thumbnails_ready:
+            return self.PENDING
+        cachefile = super().get_attribute(instance)
+        if cachefile is not None and cachefile.name:
+            # Indexed thumbnails are known to exist, skip storage check.
+            for thumbnail in instance.thumbnails.all():
+                if thumbnail.name == cachefile.name:
+                    return thumbnail
+        return cachefile
+
+    def to_representation(self, value):
+        if value == self.PENDING:
+            return value
+        return super().to_representation(value)
+
+
 class BaseCustomImagesSerializer(serializers.ModelSerializer):
     """Base serializer for Custom Images serializers."""
 
@@ -18,48 +49,43 @@ class BaseCustomImagesSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
-class BasicCustomImagesSerializer(BaseCustomImagesSerializer):
-    """Serializer of custom images for basic tier account."""
-    link_200px = serializers.ImageField(read_only=True)
-
-    class Meta(BaseCustomImagesSerializer.Meta):
-        fields = BaseCustomImagesSerializer.Meta.fields + ['link_200px']
-
-
-class PremiumCustomImagesSerializer(BaseCustomImagesSerializer):
-    """Serializer of custom images for premium tier account."""
-    link_200px = serializers.ImageField(read_only=True)
-    link_400px = serializers.ImageField(read_only=True)
-
-    class Meta(BaseCustomImagesSerializer.Meta):
-        fields = BaseCustomImagesSerializer.Meta.fields + ['image',
-                                                           'link_200px',
-                                                           'link_400px']
-
-
-class EnterpriseCustomImagesSerializer(BaseCustomImagesSerializer):
-    """Serializer of custom images for enterprise tier account."""
-    link_200px = serializers.ImageField(read_only=True)
-    link_400px = serializers.ImageField(read_only=True)
-
-    class Meta(BaseCustomImagesSerializer.Meta):
-        fields = BaseCustomImagesSerializer.Meta.fields + ['link_200px',
-                                                           'link_400px',
-                                                           'expiring_link_val',
-                                                           'expiring_link']
-
-        read_only_fields = ['expiring_link']
-
-
-class AdminCustomImagesSerializer(BaseCustomImagesSerializer):
-    """Serializer of custom images for admin custom tier account."""
-    custom_link = serializers.ImageField(read_only=True)
-
-    class Meta(BaseCustomImagesSerializer.Meta):
-        fields = BaseCustomImagesSerializer.Meta.fields \
-                 + ['custom_expiring_link',
-                    'custom_link',
-                    'image']
+class ExpiringLinkMixin(serializers.Serializer):
+    """Signed link to the original image, expiring after
+        expiring_link_val seconds."""
+    expiring_link = serializers.SerializerMethodField()
+
+    def get_expiring_link(self, obj):
+        if not (obj.image and obj.expiring_link_val):
+            return None
+        url = reverse('tiers:expiring-link',
+                      args=[links.make_token(obj, obj.expiring_link_val)])
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+
+def build_custom_images_serializer(plan, thumbnail_specs):
+    """Return custom images serializer class exposing what plan allows."""
+    fields = list(BaseCustomImagesSerializer.Meta.fields)
+    bases = (BaseCustomImagesSerializer,)
+    attrs = {}
+
+    if plan.original_image:
+        fields.append('image')
+    for spec in thumbnail_specs:
+        attrs[spec] = ThumbnailField()
+        fields.append(spec)
+    if plan.expiring_link:
+        bases = (ExpiringLinkMixin,) + bases
+        fields += ['expiring_link_val', 'expiring_link']
+    if plan.custom_thumbnail:
+        fields.append('custom_expiring_link')
+
+    attrs['Meta'] = type('Meta', (BaseCustomImagesSerializer.Meta,),
+                         {'fields': fields})
+    name = f'{plan.code.title()}PlanCustomImagesSerializer'
+    return type(name, bases, attrs)
 
 
 class TierSerializer(serializers.ModelSerializer):
@@ -71,21 +97,34 @@ class TierSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'description', 'custom_images']
         read_only_fields = ['__all__']
 
-    def _get_or_create_custom_images(self, customimages, tiers):
-        """Handle getting or creating custom images as needed."""
+    def _get_or_create_custom_images(self, customimages):
+        """Handle getting or creating custom images as needed,
+            with one lookup and one bulk insert for missing ones."""
         auth_user = self.context['request'].user
-        for custom_image in customimages:
-            custom_images_obj, created = CustomImages.objects.get_or_create(
-                user=auth_user,
-                **custom_image,
-            )
-            tiers.custom_images.add(custom_images_obj)
+        names = [custom_image['name'] for custom_image in customimages]
+
+        found = {}
+        for custom_images_obj in CustomImages.objects.filter(
+            user=auth_user,
+            name__in=names,
+        ).order_by('id'):
+            found.setdefault(custom_images_obj.name, custom_images_obj)
+
+        missing = [CustomImages(user=auth_user, name=name)
+                   for name in dict.fromkeys(names) if name not in found]
+        CustomImages.objects.bulk_create(missing)
+        found.update((custom_images_obj.name, custom_images_obj)
+                     for custom_images_obj in missing)
+
+        return [found[name] for name in names]
 
     def create(self, validated_data):
         """Create a tier."""
         custom_images = validated_data.pop('custom_images', [])
         tiers = Tier.objects.create(**validated_data)
-        self._get_or_create_custom_images(custom_images, tiers)
+        tiers.custom_images.add(
+            *self._get_or_create_custom_images(custom_images)
+        )
 
         return tiers
 
@@ -94,8 +133,9 @@ class TierSerializer(serializers.ModelSerializer):
         custom_images = validated_data.pop('custom_images', None)
 
         if custom_images is not None:
-            instance.custom_images.clear()
-            self._get_or_create_custom_images(custom_images, instance)
+            instance.custom_images.set(
+                self._get_or_create_custom_images(custom_images)
+            )
 
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
@@ -120,3 +160,61 @@ class CustomImagesImageSerializer(serializers.ModelSerializer):
         fields = ['id', 'image']
         read_only_fields = ['id']
         extra_kwargs = {'image': {'required': 'True'}}
+
+    def validate_image(self, value):
+        """Check dimensions read from image header, never decoding it,
+            against pixel budget of the account plan."""
+        width, height = value.image.size
+        max_pixels = self.context.get('max_pixels') \
+            or settings.MAX_IMAGE_PIXELS
+        if width * height > max_pixels:
+            raise serializers.ValidationError(
+                f'Image has {width * height} pixels,'
+                f' your account plan allows at most {max_pixels}.'
+            )
+        return value
+
+    def validate(self, attrs):
+        image = attrs['image']
+        attrs['image_width'], attrs['image_height'] = image.image.size
+        attrs['image_format'] = image.image.format or ''
+        attrs['image_bytes'] = image.size
+        attrs['image_sha256'] = blobs.upload_digest(image)
+        return attrs
+
+    def update(self, instance, validated_data):
+        """Point custom image at shared original, releasing previous one."""
+        previous = instance.image.name
+        validated_data['image'] = blobs.store(validated_data['image']).name
+        instance = super().update(instance, validated_data)
+        # Storing took a reference even when the content is unchanged.
+        if previous:
+            blobs.release(previous)
+        return instance
+
+
+class CustomImagesBulkUploadSerializer(serializers.Serializer):
+    """Serializer for uploading many images as new custom images."""
+    images = serializers.ListField(
+        child=serializers.FileField(),
+        allow_empty=False,
+        max_length=settings.BULK_UPLOAD_MAX_FILES,
+    )
+
+
+class CustomImagesBulkDeleteSerializer(serializers.Serializer):
+    """Serializer for deleting many custom images at once."""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.BULK_CHANGE_MAX_IDS,
+    )
+
+
+class CustomImagesBulkUpdateSerializer(CustomImagesBulkDeleteSerializer):
+    """Serializer for updating many custom images at once."""
+    # Bounds of the positive integer column, as the per-row serializer
+    # validates them on PostgreSQL.
+    expiring_link_val = serializers.IntegerField(min_value=0,
+                                                 max_value=2147483647,
+                                                 allow_null=True)
@@ -0,0 +1,70 @@
+"""
+Signals keeping cached account plans, lists and shared originals
+up to date.
+"""
+import threading
+
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db.models.signals import m2m_changed, post_save, post_delete
+from django.dispatch import receiver
+
+from tiers import blobs, listcache, plans
+from tiers.models import AccountPlan, CustomImages, Tier
+
+_state = threading.local()
+
+
+@contextmanager
+def bulk_change():
+    """Skip per-row receivers of custom images, for bulk operations
+        releasing originals and invalidating lists once themselves."""
+    previous = _in_bulk_change()
+    _state.bulk = True
+    try:
+        yield
+    finally:
+        _state.bulk = previous
+
+
+def _in_bulk_change():
+    return getattr(_state, 'bulk', False)
+
+
+@receiver([post_save, post_delete], sender=AccountPlan)
+def invalidate_plans(sender, instance, **kwargs):
+    """Reload plans and rebuild their serializers after a change."""
+    plans.clear_cache()
+
+
+@receiver(post_delete, sender=CustomImages)
+def release_image(sender, instance, **kwargs):
+    """Drop deleted custom image's reference to its original."""
+    if instance.image and not _in_bulk_change():
+        blobs.release(instance.image.name)
+
+
+@receiver([post_save, post_delete], sender=Tier)
+@receiver([post_save, post_delete], sender=CustomImages)
+def invalidate_lists(sender, instance, **kwargs):
+    """Drop cached lists of the owner after a change."""
+    if sender is CustomImages and _in_bulk_change():
+        return
+    listcache.bump(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Tier.custom_images.through)
+def invalidate_tier_lists(sender, instance, action, **kwargs):
+    """Drop cached lists of the owner after custom images of a tier
+        change."""
+    if action.startswith('post_'):
+        listcache.bump(instance.user_id)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_new_user_lists(sender, instance, created, **kwargs):
+    """Never serve a new user lists cached for a deleted user
+        of the same id."""
+    if created:
+        listcache.bump(instance.pk)
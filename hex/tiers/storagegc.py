@@ -0,0 +1,296 @@
+"""
+Incremental removal of stored originals and thumbnails no custom image
+references anymore, resuming from a checkpoint between runs.
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.signals import request_started
+from django.db import connections
+
+from tiers import cleanup
+from tiers.locks import try_file_lock
+from tiers.models import CustomImages, ImageBlob, RenderedThumbnail
+
+
+logger = logging.getLogger(__name__)
+
+ORIGINALS_DIR = os.path.join('uploads', 'tier')
+PHASES = ['originals', 'thumbnails']
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+class Report:
+    """Counts of a collection run."""
+
+    def __init__(self):
+        self.scanned = 0
+        self.deleted = 0
+        self.reclaimed = 0
+        self.finished = False
+        self.skipped = False
+
+    def __str__(self):
+        return (f'scanned {self.scanned} files, deleted {self.deleted},'
+                f' reclaimed {self.reclaimed} bytes')
+
+
+def load_checkpoint():
+    """Return saved position of the collector, empty when there is none."""
+    try:
+        with open(settings.STORAGE_GC_CHECKPOINT) as checkpoint:
+            return json.load(checkpoint)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_checkpoint(state):
+    """Atomically replace saved position of the collector."""
+    path = settings.STORAGE_GC_CHECKPOINT
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as checkpoint:
+        json.dump(state, checkpoint)
+    os.replace(tmp_path, path)
+
+
+def _walk(path, parts, after):
+    """Yield (parts, entry) of files below path in sorted order, skipping
+        those up to after, and of every directory once it was walked."""
+    try:
+        entries = sorted(os.scandir(path), key=lambda entry: entry.name)
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        entry_parts = parts + (entry.name,)
+        if entry.is_dir(follow_symlinks=False):
+            if entry_parts < after[:len(entry_parts)]:
+                continue
+            yield from _walk(entry.path, entry_parts, after)
+            yield entry_parts, entry
+        elif entry_parts > after:
+            yield entry_parts, entry
+
+
+def _referenced_originals(names):
+    """Return names of originals a custom image or blob in use refers to."""
+    return set(
+        CustomImages.objects.filter(image__in=names)
+        .values_list('image', flat=True)
+    ) | set(
+        ImageBlob.objects.filter(name__in=names, ref_count__gt=0)
+        .values_list('name', flat=True)
+    )
+
+
+def _released_blobs(names):
+    """Return names of originals stored by blobs no longer in use."""
+    return set(
+        ImageBlob.objects.filter(name__in=names, ref_count=0)
+        .values_list('name', flat=True)
+    )
+
+
+def _referenced_thumbnails(names):
+    """Return names of thumbnails indexed or with their source stored.
+        Originals are collected first, so a stored source is one still
+        referenced or uploaded too recently to be collected."""
+    referenced = set(
+        RenderedThumbnail.objects.filter(name__in=names)
+        .values_list('name', flat=True)
+    )
+    listings = {}
+    for name in set(names) - referenced:
+        # Cache files of a source live in a directory named after it.
+        source = os.path.relpath(os.path.dirname(name),
+                                 settings.IMAGEKIT_CACHEFILE_DIR)
+        source_dir, stem = os.path.split(source)
+        if source_dir not in listings:
+            try:
+                listings[source_dir] = {
+                    os.path.splitext(filename)[0] for filename
+                    in os.listdir(default_storage.path(source_dir))
+                }
+            except FileNotFoundError:
+                listings[source_dir] = set()
+        if stem in listings[source_dir]:
+            referenced.add(name)
+    return referenced
+
+
+class Collector:
+    """Walks storage in batches, deleting files unreferenced
+        in the database and older than min_age seconds."""
+
+    def __init__(self, batch_size=None, rate=None, min_age=None,
+                 dry_run=False):
+        self.batch_size = batch_size or settings.STORAGE_GC_BATCH_SIZE
+        self.rate = settings.STORAGE_GC_RATE if rate is None else rate
+        self.min_age = settings.STORAGE_GC_MIN_AGE if min_age is None \
+            else min_age
+        self.dry_run = dry_run
+
+    def _delete(self, path, stat, report):
+        if not self.dry_run:
+            try:
+                # Keep files replaced since examined, e.g. an original
+                # whose content was uploaded again meanwhile.
+                current = os.stat(path)
+                if (current.st_ino, current.st_mtime_ns) \
+                        != (stat.st_ino, stat.st_mtime_ns):
+                    return
+                os.remove(path)
+            except FileNotFoundError:
+                return
+        report.deleted += 1
+        report.reclaimed += stat.st_size
+
+    def _delete_blob(self, name, stat, report):
+        """Delete blob left unused, along with its original and
+            thumbnails, unless an upload refers to it again meanwhile."""
+        if not self.dry_run and not cleanup.delete_files([name]):
+            return
+        report.deleted += 1
+        report.reclaimed += stat.st_size
+
+    def _remove_dir(self, entry, cutoff):
+        """Remove directory left empty, unless changed recently
+            and possibly about to receive a file."""
+        if self.dry_run:
+            return
+        try:
+            if entry.stat(follow_symlinks=False).st_mtime < cutoff:
+                os.rmdir(entry.path)
+        except OSError:
+            pass
+
+    def _collect_batch(self, root, is_referenced, batch, report):
+        names = [os.path.join(root, *parts) for parts, stat in batch]
+        referenced = is_referenced(names)
+        unreferenced = [(name, stat) for name, (parts, stat)
+                        in zip(names, batch) if name not in referenced]
+        released = _released_blobs([name for name, stat in unreferenced]) \
+            if root == ORIGINALS_DIR else set()
+        for name, stat in unreferenced:
+            if name in released:
+                self._delete_blob(name, stat, report)
+            else:
+                self._delete(default_storage.path(name), stat, report)
+
+    def _throttle(self, started, count):
+        if self.rate:
+            delay = count / self.rate - (time.monotonic() - started)
+            if delay > 0:
+                time.sleep(delay)
+
+    def run(self, limit=None, interval=None):
+        """Collect up to limit files from the checkpoint on. Skip the run
+            while another process collects, or when a run started within
+            interval seconds. Return Report of the run."""
+        report = Report()
+        with try_file_lock('storage-gc') as acquired:
+            state = load_checkpoint()
+            ran_recently = interval \
+                and time.time() - state.get('ran_at', 0) < interval
+            if not acquired or ran_recently:
+                report.skipped = True
+                return report
+            self.ran_at = time.time()
+            self._save(state)
+            phase = state.get('phase', PHASES[0])
+            after = tuple(filter(None, state.get('after', '').split('/')))
+
+            for phase in PHASES[PHASES.index(phase):]:
+                if self._run_phase(phase, after, limit, report):
+                    return report
+                after = ()
+
+            report.finished = True
+            self._save({})
+        return report
+
+    def _save(self, state):
+        """Save checkpoint, along with when the run started."""
+        if not self.dry_run:
+            save_checkpoint(dict(state, ran_at=self.ran_at))
+
+    def _run_phase(self, phase, after, limit, report):
+        """Collect files of phase, return whether limit stopped it."""
+        root, is_referenced = {
+            'originals': (ORIGINALS_DIR, _referenced_originals),
+            'thumbnails': (settings.IMAGEKIT_CACHEFILE_DIR,
+                           _referenced_thumbnails),
+        }[phase]
+        cutoff = time.time() - self.min_age
+        batch = []
+        started = time.monotonic()
+        for parts, entry in _walk(default_storage.path(root), (), after):
+            if entry.is_dir(follow_symlinks=False):
+                self._remove_dir(entry, cutoff)
+                continue
+            report.scanned += 1
+            try:
+                stat = entry.stat(follow_symlinks=False)
+            except FileNotFoundError:
+                stat = None
+            if stat and stat.st_mtime < cutoff:
+                batch.append((parts, stat))
+
+            if report.scanned % self.batch_size == 0:
+                self._collect_batch(root, is_referenced, batch, report)
+                batch = []
+                self._save({'phase': phase, 'after': '/'.join(parts)})
+                self._throttle(started, self.batch_size)
+                started = time.monotonic()
+                if limit and report.scanned >= limit:
+                    return True
+
+        if batch:
+            self._collect_batch(root, is_referenced, batch, report)
+        return False
+
+
+def _run_periodically(interval):
+    """Collect a limited number of files every interval seconds."""
+    while True:
+        time.sleep(interval)
+        try:
+            report = Collector().run(limit=settings.STORAGE_GC_RUN_LIMIT,
+                                     interval=interval)
+            if report.deleted:
+                logger.info('Collected storage garbage: %s', report)
+        except Exception:
+            logger.exception('Collecting storage garbage failed')
+        finally:
+            connections.close_all()
+
+
+def _start_thread(**kwargs):
+    """Start the scheduler thread, unless this process runs it already."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is not None:
+            return
+        _scheduler = threading.Thread(
+            target=_run_periodically,
+            args=(settings.STORAGE_GC_INTERVAL,),
+            name='storage-gc',
+            daemon=True,
+        )
+        _scheduler.start()
+
+
+def start_scheduler():
+    """Collect periodically in a daemon thread when STORAGE_GC_INTERVAL
+        is set. The thread starts on the first request of the process,
+        so servers forking workers after loading the application run it
+        in the workers."""
+    if settings.STORAGE_GC_INTERVAL:
+        request_started.connect(_start_thread, dispatch_uid='storage-gc')
@@ -0,0 +1,174 @@
+"""
+Tests for async views of the tiers API.
+"""
+import tempfile
+
+from asgiref.sync import async_to_sync
+
+from django.contrib.auth import get_user_model
+from django.core.signals import request_finished
+from django.db import close_old_connections
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from PIL import Image
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from hex.asgi import application
+from tiers.models import CustomImages, Tier
+from user.authentication import token_cache
+
+
+def async_download_url(custom_images_id):
+    """Create and return an async custom image download url."""
+    return reverse('tiers:async-customimages-download',
+                   args=[custom_images_id])
+
+
+def asgi_get(path, headers):
+    """Send GET request through the ASGI application,
+        returning response status, headers and body."""
+    messages = []
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'query_string': b'',
+        'headers': [(b'host', b'testserver')] + headers,
+        'server': ('testserver', 80),
+    }
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    # Same as the test client, keep the test transaction's connection.
+    request_finished.disconnect(close_old_connections)
+    try:
+        async_to_sync(application)(scope, receive, send)
+    finally:
+        request_finished.connect(close_old_connections)
+
+    start = messages[0]
+    body = b''.join(message.get('body', b'') for message in messages[1:])
+    return start['status'], dict(start['headers']), body, len(messages)
+
+
+class AsyncApiTests(TestCase):
+    """Test async views return the same data as sync ones."""
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+            account_plan='pp',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.auth = f'Token {self.token.key}'
+        self.client = Client(HTTP_AUTHORIZATION=self.auth)
+        self.api_client = APIClient()
+        self.api_client.credentials(HTTP_AUTHORIZATION=self.auth)
+
+        self.custom_img = CustomImages.objects.create(user=self.user,
+                                                      name='Image1')
+        with tempfile.NamedTemporaryFile(suffix='.png') as image_file:
+            Image.new('RGB', (10, 10)).save(image_file, format='PNG')
+            image_file.seek(0)
+            self.custom_img.image.save('image.png', image_file)
+        self.tier = Tier.objects.create(user=self.user, title='Tier1')
+        self.tier.custom_images.add(self.custom_img)
+
+    def tearDown(self):
+        self.custom_img.image.delete()
+
+    def test_requires_token(self):
+        """Test async views reject unauthenticated requests."""
+        res = Client().get(reverse('tiers:async-tier-list'))
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn('WWW-Authenticate', res)
+
+    def test_session_authentication(self):
+        """Test async views accept session login like sync views."""
+        client = Client()
+        client.force_login(self.user)
+
+        res = client.get(reverse('tiers:async-tier-list'))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()['results'][0]['id'], self.tier.id)
+
+    def test_lists_match_sync_views(self):
+        """Test async lists return the same JSON as sync lists."""
+        for async_name, sync_name in [
+            ('tiers:async-tier-list', 'tiers:tier-list'),
+            ('tiers:async-customimages-list', 'tiers:customimages-list'),
+        ]:
+            res = self.client.get(reverse(async_name))
+            expected = self.api_client.get(reverse(sync_name))
+
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(res.json(), expected.json())
+
+    def test_tier_detail_matches_sync_view(self):
+        """Test async tier detail returns the same JSON as sync one."""
+        res = self.client.get(
+            reverse('tiers:async-tier-detail', args=[self.tier.id])
+        )
+        expected = self.api_client.get(
+            reverse('tiers:tier-detail', args=[self.tier.id])
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), expected.json())
+
+    def test_tier_detail_of_other_user_not_found(self):
+        """Test async tier detail hides tiers of other users."""
+        other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='testpass123',
+        )
+        tier = Tier.objects.create(user=other, title='Other')
+
+        res = self.client.get(reverse('tiers:async-tier-detail',
+                                      args=[tier.id]))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_download_streams_through_asgi(self):
+        """Test ASGI application streams async file responses."""
+        with self.custom_img.image.open('rb') as image_file:
+            content = image_file.read()
+
+        status_code, headers, body, messages = asgi_get(
+            async_download_url(self.custom_img.id),
+            [(b'authorization', self.auth.encode())],
+        )
+
+        self.assertEqual(status_code, status.HTTP_200_OK)
+        self.assertEqual(body, content)
+        self.assertEqual(headers[b'Content-Type'], b'image/png')
+        self.assertGreater(messages, 2)
+
+    def test_download_range_through_asgi(self):
+        """Test async download honours byte ranges."""
+        with self.custom_img.image.open('rb') as image_file:
+            content = image_file.read()
+
+        status_code, headers, body, messages = asgi_get(
+            async_download_url(self.custom_img.id),
+            [(b'authorization', self.auth.encode()),
+             (b'range', b'bytes=0-9')],
+        )
+
+        self.assertEqual(status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(body, content[:10])
@@ -0,0 +1,70 @@
+"""
+Tests for coalescing thumbnail generation.
+"""
+import os
+import tempfile
+import threading
+import time
+
+from unittest.mock import MagicMock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from tiers import metrics
+from tiers.cachefiles import CoalescingBackend
+from tiers.locks import file_lock
+
+
+class CoalescingBackendTests(SimpleTestCase):
+    """Test only one process renders a missing cache file."""
+
+    def setUp(self):
+        cache.clear()
+        self.backend = CoalescingBackend()
+        self.file = MagicMock()
+        self.file.name = 'CACHE/images/test/coalescing.png'
+        self.file._file = None
+        self.file.storage.exists.return_value = False
+
+    def test_generate_missing_file(self):
+        """Test missing file is rendered and counted."""
+        self.backend.generate_now(self.file)
+
+        self.file._generate.assert_called_once()
+        self.assertEqual(metrics.snapshot()[metrics.RENDERED], 1)
+
+    def test_waiter_reuses_rendered_file(self):
+        """Test request waiting for another render does not render again."""
+        locked = threading.Event()
+
+        def render_elsewhere():
+            with file_lock(self.file.name):
+                locked.set()
+                time.sleep(0.2)
+                self.file.storage.exists.return_value = True
+
+        thread = threading.Thread(target=render_elsewhere)
+        thread.start()
+        locked.wait()
+        self.backend.generate_now(self.file)
+        thread.join()
+
+        self.file._generate.assert_not_called()
+        self.assertEqual(metrics.snapshot(),
+                         {metrics.RENDERED: 0, metrics.COALESCED: 1})
+
+
+class FileLockTests(SimpleTestCase):
+    """Test locks shared by processes."""
+
+    def test_lock_files_are_bounded(self):
+        """Test any number of keys uses at most one file per slot."""
+        with tempfile.TemporaryDirectory() as lock_dir, \
+                override_settings(RENDER_LOCK_DIR=lock_dir,
+                                  RENDER_LOCK_SLOTS=4):
+            for i in range(50):
+                with file_lock(f'CACHE/images/test/{i}.jpg'):
+                    pass
+
+            self.assertLessEqual(len(os.listdir(lock_dir)), 4)
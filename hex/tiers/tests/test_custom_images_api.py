@@ -1,17 +1,34 @@
 """
 Tests for the custom images API.
 """
+import hashlib
+import json
+import os
+import re
+import tempfile
+
+from base64 import urlsafe_b64encode
+from io import BytesIO
+from types import SimpleNamespace
+from unittest.mock import patch
+
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.urls import reverse
-from django.test import TestCase
+from django.test import TestCase, override_settings
+
+from PIL import Image
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from tiers.models import CustomImages
-from tiers import serializers
+from tiers.models import CustomImages, ImageBlob, Tier
+from tiers import plans, rendering, signals
+from tiers.views import CustomImagesViewSet
 
 CUSTOM_IMAGES_URL = reverse('tiers:customimages-list')
+BULK_UPLOAD_URL = reverse('tiers:customimages-bulk-upload')
+BULK_CHANGE_URL = reverse('tiers:customimages-bulk-change')
 
 
 def detail_url(custom_images_id):
@@ -54,10 +71,55 @@ class PrivateCustomImagesApiTests(TestCase):
         res = self.client.get(CUSTOM_IMAGES_URL)
 
         custom_images = CustomImages.objects.all().order_by('-name')
-        serializer = serializers.BasicCustomImagesSerializer(custom_images,
-                                                             many=True)
+        serializer_class = plans.serializer_for_plan('bp')
+        serializer = serializer_class(custom_images, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
+
+    def test_custom_images_cursor_pagination(self):
+        """Test walking pages of custom images with duplicate names."""
+        for name in ['A', 'B', 'B', 'B', 'C']:
+            CustomImages.objects.create(user=self.user, name=name)
+        expected = list(CustomImages.objects.order_by(
+            '-name', '-id'
+        ).values_list('id', flat=True))
+
+        ids = []
+        pages = []
+        url = CUSTOM_IMAGES_URL + '?page_size=2'
+        while url:
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            pages.append(res.data)
+            ids += [item['id'] for item in res.data['results']]
+            url = res.data['next']
+
+        self.assertEqual(ids, expected)
+        self.assertEqual(len(pages), 3)
+        self.assertIsNone(pages[0]['previous'])
+        res = self.client.get(pages[2]['previous'])
+        self.assertEqual(res.data['results'], pages[1]['results'])
+
+    def test_custom_images_invalid_cursor(self):
+        """Test malformed cursor returns not found."""
+        res = self.client.get(CUSTOM_IMAGES_URL + '?cursor=invalid')
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_with_invalid_values(self):
+        """Test cursor holding values of the wrong type returns not
+            found."""
+        for url, position in [
+            (reverse('tiers:tier-list'), ['x']),
+            (CUSTOM_IMAGES_URL, ['n', 'x']),
+            (CUSTOM_IMAGES_URL, [None, 1]),
+        ]:
+            cursor = urlsafe_b64encode(
+                json.dumps({'r': 0, 'p': position}).encode()
+            ).decode()
+            res = self.client.get(url, {'cursor': cursor})
+
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
 
     def test_custom_images_are_limited_to_user(self):
         """Test list of custom images is limited to authenticated user."""
@@ -69,9 +131,51 @@ class PrivateCustomImagesApiTests(TestCase):
         res = self.client.get(CUSTOM_IMAGES_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], custom_image.name)
-        self.assertEqual(res.data[0]['id'], custom_image.id)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], custom_image.name)
+        self.assertEqual(res.data['results'][0]['id'], custom_image.id)
+
+    def test_filter_custom_images_assigned_to_tiers(self):
+        """Test listing custom images assigned to tiers only."""
+        assigned = CustomImages.objects.create(user=self.user, name='Img1')
+        CustomImages.objects.create(user=self.user, name='Img2')
+        for title in ['Tier1', 'Tier2']:
+            tier = Tier.objects.create(user=self.user, title=title)
+            tier.custom_images.add(assigned)
+
+        res = self.client.get(CUSTOM_IMAGES_URL, {'assigned_only': 1})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['id'] for item in res.data['results']],
+                         [assigned.id])
+
+    def test_assigned_only_uses_through_table_index(self):
+        """Test assigned_only is a semi-join using customimages_id index."""
+        view = CustomImagesViewSet()
+        view.request = SimpleNamespace(user=self.user,
+                                       query_params={'assigned_only': '1'})
+        queryset = view.get_queryset()
+
+        self.assertNotIn('DISTINCT', str(queryset.query))
+        if connection.vendor != 'postgresql':
+            self.skipTest('Query plans are checked on PostgreSQL only.')
+
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            constraints = connection.introspection.get_constraints(
+                cursor, Tier.custom_images.through._meta.db_table,
+            )
+            plan = queryset.explain()
+
+        index_names = [name for name, constraint in constraints.items()
+                       if constraint['index']
+                       and 'customimages_id' in constraint['columns']]
+        self.assertTrue(
+            any(re.search(rf'Index (Only )?Scan using {re.escape(name)} ',
+                          plan)
+                for name in index_names),
+            plan,
+        )
 
     def test_update_custom_images(self):
         """Test updating a custom images"""
@@ -97,3 +201,280 @@ class PrivateCustomImagesApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
         custom_image = CustomImages.objects.filter(user=self.user)
         self.assertFalse(custom_image.exists())
+
+    def test_bulk_upload_images(self):
+        """Test uploading many images reports result of every item."""
+        files = []
+        for name in ['first', 'second']:
+            image_file = tempfile.NamedTemporaryFile(prefix=name,
+                                                     suffix='.png')
+            Image.new('RGB', (10, 10)).save(image_file, format='PNG')
+            image_file.seek(0)
+            files.append(image_file)
+        bad_file = tempfile.NamedTemporaryFile(suffix='.png')
+        bad_file.write(b'not an image')
+        bad_file.seek(0)
+        files.append(bad_file)
+
+        res = self.client.post(BULK_UPLOAD_URL, {'images': files},
+                               format='multipart')
+        for image_file in files:
+            image_file.close()
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 3)
+        self.assertIn('errors', res.data[2])
+        custom_images = CustomImages.objects.filter(
+            user=self.user
+        ).order_by('id')
+        self.assertEqual(custom_images.count(), 2)
+        for result, custom_image in zip(res.data, custom_images):
+            self.assertEqual(result['id'], custom_image.id)
+            self.assertTrue(custom_image.name.startswith('first')
+                            or custom_image.name.startswith('second'))
+            custom_image.image.delete()
+
+    def test_bulk_upload_hashes_images_while_streaming(self):
+        """Test bulk uploaded images are stored without re-reading them."""
+        files = []
+        for color in ['red', 'blue']:
+            image_file = BytesIO()
+            Image.new('RGB', (10, 10), color).save(image_file, format='PNG')
+            image_file.name = f'{color}.png'
+            image_file.seek(0)
+            files.append(image_file)
+
+        with patch('tiers.blobs.file_digest') as file_digest:
+            res = self.client.post(BULK_UPLOAD_URL, {'images': files},
+                                   format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        file_digest.assert_not_called()
+        for image_file, custom_image in zip(
+            files, CustomImages.objects.order_by('id')
+        ):
+            digest = hashlib.sha256(image_file.getvalue()).hexdigest()
+            self.assertEqual(custom_image.image_sha256, digest)
+            self.assertIn(digest, custom_image.image.name)
+            custom_image.image.delete()
+
+    def test_bulk_upload_more_files_than_django_default(self):
+        """Test bulk upload accepts more files than Django allows
+            by default."""
+        image_file = BytesIO()
+        Image.new('RGB', (10, 10)).save(image_file, format='PNG')
+        files = []
+        for i in range(101):
+            upload = BytesIO(image_file.getvalue())
+            upload.name = f'image{i}.png'
+            files.append(upload)
+
+        res = self.client.post(BULK_UPLOAD_URL, {'images': files},
+                               format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 101)
+        custom_images = CustomImages.objects.filter(user=self.user)
+        self.assertEqual(custom_images.count(), 101)
+        custom_images.first().image.delete()
+
+    def test_bulk_upload_without_images(self):
+        """Test bulk upload without any image fails."""
+        res = self.client.post(BULK_UPLOAD_URL, {}, format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_update_custom_images(self):
+        """Test updating expiring link of many custom images at once."""
+        self.user.account_plan = 'ep'
+        self.user.save()
+        other_user = create_user(email='other@example.com')
+        custom_images = [
+            CustomImages.objects.create(user=self.user, name=f'Image{i}')
+            for i in range(3)
+        ]
+        other = CustomImages.objects.create(user=other_user, name='Other')
+
+        payload = {'ids': [custom_images[0].id, custom_images[1].id,
+                           other.id],
+                   'expiring_link_val': 600}
+        res = self.client.patch(BULK_CHANGE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'updated': 2})
+        self.assertEqual(
+            list(CustomImages.objects.order_by('id')
+                 .values_list('expiring_link_val', flat=True)),
+            [600, 600, None, None],
+        )
+
+    def test_bulk_update_rejects_out_of_range_value(self):
+        """Test values the column can't hold fail validation."""
+        self.user.account_plan = 'ep'
+        self.user.save()
+        custom_image = CustomImages.objects.create(user=self.user,
+                                                   name='Image')
+
+        res = self.client.patch(BULK_CHANGE_URL,
+                                {'ids': [custom_image.id],
+                                 'expiring_link_val': 2 ** 31},
+                                format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('expiring_link_val', res.data)
+
+    def test_bulk_update_requires_expiring_link_plan(self):
+        """Test plans without expiring links can't bulk update them."""
+        custom_image = CustomImages.objects.create(user=self.user,
+                                                   name='Image')
+
+        res = self.client.patch(BULK_CHANGE_URL,
+                                {'ids': [custom_image.id],
+                                 'expiring_link_val': 600},
+                                format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_bulk_delete_custom_images(self):
+        """Test deleting many custom images of the user at once."""
+        other_user = create_user(email='other@example.com')
+        custom_images = [
+            CustomImages.objects.create(user=self.user, name=f'Image{i}')
+            for i in range(3)
+        ]
+        other = CustomImages.objects.create(user=other_user, name='Other')
+        ids = [custom_image.id for custom_image in custom_images[:2]]
+
+        res = self.client.delete(BULK_CHANGE_URL,
+                                 {'ids': ids + [other.id]},
+                                 format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'deleted': 2})
+        self.assertEqual(
+            list(CustomImages.objects.order_by('id')),
+            [custom_images[2], other],
+        )
+
+    @override_settings(STORAGE_CLEANUP_WORKERS=0, THUMBNAIL_RENDER_WORKERS=0)
+    def test_bulk_delete_removes_unreferenced_originals(self):
+        """Test originals are removed after their last custom image."""
+        image_file = tempfile.NamedTemporaryFile(suffix='.png')
+        Image.new('RGB', (10, 10)).save(image_file, format='PNG')
+        image_file.seek(0)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(BULK_UPLOAD_URL,
+                             {'images': [image_file]},
+                             format='multipart')
+            image_file.seek(0)
+            self.client.post(BULK_UPLOAD_URL,
+                             {'images': [image_file]},
+                             format='multipart')
+        image_file.close()
+        first, second = CustomImages.objects.order_by('id')
+        path = first.image.path
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.delete(BULK_CHANGE_URL,
+                                     {'ids': [first.id]},
+                                     format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(ImageBlob.objects.get().ref_count, 1)
+        self.assertTrue(os.path.exists(path))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(BULK_CHANGE_URL, {'ids': [second.id]},
+                               format='json')
+        self.assertFalse(ImageBlob.objects.exists())
+        self.assertFalse(os.path.exists(path))
+
+    def test_nested_bulk_change_skips_receivers(self):
+        """Test leaving nested bulk change keeps the outer one active."""
+        custom_image = CustomImages.objects.create(user=self.user,
+                                                   name='Image',
+                                                   image='a.jpg')
+
+        with patch('tiers.blobs.release') as release:
+            with signals.bulk_change():
+                with signals.bulk_change():
+                    pass
+                custom_image.delete()
+
+        release.assert_not_called()
+
+    def test_bulk_change_without_ids(self):
+        """Test bulk delete without any id fails."""
+        res = self.client.delete(BULK_CHANGE_URL, {'ids': []},
+                                 format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+@patch('django.core.signing.time.time', return_value=1700000000)
+@patch('tiers.links.time.time', return_value=1700000000)
+class FastListTests(TestCase):
+    """Test fast list path renders like plan serializers."""
+
+    def setUp(self):
+        self.user = create_user()
+        # Render thumbnails of every size used by the plans under test.
+        self.user.account_plan = 'ep'
+        self.user.save()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        self.rendered = CustomImages.objects.create(user=self.user,
+                                                    name='Rendered',
+                                                    expiring_link_val=300)
+        with tempfile.NamedTemporaryFile(suffix='.png') as image_file:
+            Image.new('RGB', (10, 10)).save(image_file, format='PNG')
+            image_file.seek(0)
+            self.rendered.image.save('image.png', image_file)
+        rendering.render_thumbnails(self.rendered.id)
+        CustomImages.objects.create(user=self.user, name='Pending',
+                                    image=self.rendered.image.name)
+        CustomImages.objects.create(user=self.user, name='Empty')
+
+    def tearDown(self):
+        self.rendered.image.delete()
+
+    def _expected(self, request):
+        """Return list rendered by the plan serializer."""
+        serializer_class = plans.serializer_for_plan(
+            self.user.account_plan
+        )
+        queryset = CustomImages.objects.filter(
+            user=self.user,
+        ).prefetch_related('thumbnails').order_by('-name', '-id')
+        return [dict(item) for item in serializer_class(
+            queryset, many=True, context={'request': request},
+        ).data]
+
+    def test_matches_plan_serializers(self, *mocks):
+        """Test every plan gets the same JSON as from its serializer."""
+        for code in ['bp', 'pp', 'ep']:
+            with self.subTest(plan=code):
+                self.user.account_plan = code
+                self.user.save()
+                self.client.force_authenticate(self.user)
+
+                with patch.object(CustomImagesViewSet, 'get_serializer',
+                                  side_effect=AssertionError):
+                    res = self.client.get(CUSTOM_IMAGES_URL)
+
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+                self.assertEqual(res.data['results'],
+                                 self._expected(res.wsgi_request))
+
+    def test_falls_back_to_serializer_for_unindexed_thumbnail(self, *mocks):
+        """Test rows without indexed thumbnails use the serializer."""
+        self.rendered.thumbnails.all().delete()
+        self.user.account_plan = 'pp'
+        self.user.save()
+        self.client.force_authenticate(self.user)
+
+        res = self.client.get(CUSTOM_IMAGES_URL)
+
+        self.assertEqual(res.data['results'],
+                         self._expected(res.wsgi_request))
+        self.assertTrue(res.data['results'][0]['link_200px'])
@@ -0,0 +1,166 @@
+"""
+Tests for the image download API.
+"""
+import tempfile
+
+from io import BytesIO
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from PIL import Image, features
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from tiers import formats
+from tiers.models import CustomImages
+
+
+def download_url(custom_images_id, spec=None):
+    """Create and return a custom image download url."""
+    url = reverse('tiers:customimages-download', args=[custom_images_id])
+    if spec:
+        url += f'?spec={spec}'
+    return url
+
+
+class DownloadApiTests(TestCase):
+    """Test downloading original images and thumbnails."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+            account_plan='pp',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.custom_img = CustomImages.objects.create(user=self.user,
+                                                      name='Image1')
+        with tempfile.NamedTemporaryFile(suffix='.png') as image_file:
+            Image.new('RGB', (10, 10)).save(image_file, format='PNG')
+            image_file.seek(0)
+            self.custom_img.image.save('image.png', image_file)
+        self.custom_img.image.open('rb')
+        self.content = self.custom_img.image.read()
+        self.custom_img.image.close()
+
+    def tearDown(self):
+        self.custom_img.image.delete()
+
+    def test_download_original(self):
+        """Test downloading original image with validators."""
+        res = self.client.get(download_url(self.custom_img.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(res.streaming_content), self.content)
+        self.assertEqual(res['Content-Type'], 'image/png')
+        self.assertIn('ETag', res)
+        self.assertIn('Last-Modified', res)
+
+    def test_download_not_modified(self):
+        """Test matching If-None-Match returns 304 without body."""
+        etag = self.client.get(download_url(self.custom_img.id))['ETag']
+
+        res = self.client.get(download_url(self.custom_img.id),
+                              HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_download_range(self):
+        """Test requesting a byte range returns partial content."""
+        res = self.client.get(download_url(self.custom_img.id),
+                              HTTP_RANGE='bytes=2-5')
+
+        self.assertEqual(res.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(b''.join(res.streaming_content), self.content[2:6])
+        self.assertEqual(res['Content-Range'],
+                         f'bytes 2-5/{len(self.content)}')
+
+    def test_download_range_not_satisfiable(self):
+        """Test range starting after end of file returns 416."""
+        res = self.client.get(download_url(self.custom_img.id),
+                              HTTP_RANGE=f'bytes={len(self.content)}-')
+
+        self.assertEqual(res.status_code,
+                         status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+
+    def test_download_thumbnail(self):
+        """Test downloading a thumbnail the plan is entitled to."""
+        res = self.client.get(download_url(self.custom_img.id, 'link_400px'))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        thumbnail = Image.open(self.custom_img.link_400px.path)
+        self.assertEqual(thumbnail.size, (400, 400))
+
+    def test_download_thumbnail_jpeg_fallback(self):
+        """Test thumbnails are JPEG unless client accepts WebP."""
+        res = self.client.get(download_url(self.custom_img.id, 'link_200px'),
+                              HTTP_ACCEPT='image/png,image/*')
+
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertIn('Accept', res['Vary'])
+        thumbnail = Image.open(BytesIO(b''.join(res.streaming_content)))
+        self.assertEqual(thumbnail.format, 'JPEG')
+
+    @skipUnless(features.check('webp'), 'Pillow built without WebP.')
+    def test_download_thumbnail_webp(self):
+        """Test thumbnail is WebP when client accepts it."""
+        res = self.client.get(download_url(self.custom_img.id, 'link_200px'),
+                              HTTP_ACCEPT='image/webp,image/*')
+
+        self.assertEqual(res['Content-Type'], 'image/webp')
+        thumbnail = Image.open(BytesIO(b''.join(res.streaming_content)))
+        self.assertEqual(thumbnail.format, 'WEBP')
+
+    @override_settings(LIST_CACHE_TTL=0)
+    @patch('tiers.formats.FORMATS', [formats.JPEG, formats.WEBP])
+    def test_list_links_ignore_accept_header(self):
+        """Test list links are the same JPEG thumbnails for every client,
+            WebP being negotiated on download only."""
+        CustomImages.objects.update(thumbnails_ready=True)
+
+        results = [
+            self.client.get(reverse('tiers:customimages-list'),
+                            HTTP_ACCEPT=accept).data['results']
+            for accept in ['application/json',
+                           'application/json, image/webp']
+        ]
+
+        self.assertEqual(results[0], results[1])
+        self.assertTrue(results[0][0]['link_200px'].endswith('.jpg'))
+
+    def test_download_original_forbidden_for_basic_plan(self):
+        """Test basic plan can't download original image."""
+        self.user.account_plan = 'bp'
+        self.user.save()
+
+        res = self.client.get(download_url(self.custom_img.id))
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_download_custom_link_without_size(self):
+        """Test custom thumbnail with no size set yet is not found."""
+        self.user.account_plan = 'ap'
+        self.user.save()
+
+        res = self.client.get(download_url(self.custom_img.id,
+                                           'custom_link'))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(MEDIA_SENDFILE_HEADER='X-Accel-Redirect',
+                       MEDIA_ACCEL_PREFIX='/protected/')
+    def test_download_accel_redirect(self):
+        """Test sending file is left to the front web server."""
+        res = self.client.get(download_url(self.custom_img.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['X-Accel-Redirect'],
+                         '/protected/' + self.custom_img.image.name)
+        self.assertEqual(res.content, b'')
@@ -0,0 +1,82 @@
+"""
+Tests for signed, expiring links API.
+"""
+import tempfile
+
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from PIL import Image
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from tiers import links
+from tiers.models import CustomImages
+
+CUSTOM_IMAGES_URL = reverse('tiers:customimages-list')
+
+
+def expiring_link_url(token):
+    """Create and return an expiring link url."""
+    return reverse('tiers:expiring-link', args=[token])
+
+
+class ExpiringLinkApiTests(TestCase):
+    """Test expiring links of enterprise accounts."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+            account_plan='ep',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.custom_img = CustomImages.objects.create(user=self.user,
+                                                      name='Image1',
+                                                      expiring_link_val=300)
+        with tempfile.NamedTemporaryFile(suffix='.png') as image_file:
+            Image.new('RGB', (10, 10)).save(image_file, format='PNG')
+            image_file.seek(0)
+            self.custom_img.image.save('image.png', image_file)
+
+    def tearDown(self):
+        self.custom_img.image.delete()
+
+    def test_list_contains_expiring_link(self):
+        """Test enterprise list returns a working expiring link."""
+        res = self.client.get(CUSTOM_IMAGES_URL)
+
+        link = res.data['results'][0]['expiring_link']
+        self.assertIn('/api/tier/expiring/', link)
+
+        self.client.logout()
+        with self.assertNumQueries(0):
+            res = self.client.get(link)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.custom_img.image.open('rb')
+        self.assertEqual(b''.join(res.streaming_content),
+                         self.custom_img.image.read())
+        self.custom_img.image.close()
+
+    def test_tampered_link_forbidden(self):
+        """Test link with modified token is refused."""
+        token = links.make_token(self.custom_img, 300)
+
+        res = self.client.get(expiring_link_url(token[:-1] + 'x'))
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_expired_link_forbidden(self):
+        """Test link is refused after it expired."""
+        token = links.make_token(self.custom_img, 300)
+
+        with patch('tiers.links.time.time', return_value=10 ** 12):
+            res = self.client.get(expiring_link_url(token))
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
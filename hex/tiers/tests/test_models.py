@@ -1,7 +1,11 @@
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase
 
+from io import BytesIO
 from unittest.mock import patch
 
+from PIL import Image
+
 from tiers import models
 from django.contrib.auth import get_user_model
 
@@ -43,3 +47,20 @@ class ModelTests(TestCase):
                                                           name='image1')
 
         self.assertEqual(str(custom_image), custom_image.name)
+
+    def test_multi_size_thumbnail_renders_all_sizes(self):
+        """Test every size is rendered from a single decode of source."""
+        buffer = BytesIO()
+        Image.new('RGB', (1000, 800)).save(buffer, format='JPEG')
+        source = SimpleUploadedFile('example.jpg', buffer.getvalue())
+        generator = models.MultiSizeThumbnail(source=source,
+                                              sizes=[(200, 200), (400, 400)])
+
+        with patch('tiers.models.open_image',
+                   wraps=models.open_image) as mock_open:
+            rendered = generator.generate_all()
+
+        mock_open.assert_called_once()
+        for (size, format), content in rendered.items():
+            self.assertEqual(Image.open(content).size, size)
+            self.assertEqual(format, generator.format)
@@ -0,0 +1,70 @@
+"""
+Tests for the account plans registry.
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from tiers import plans
+from tiers.models import AccountPlan, CustomImages
+
+CUSTOM_IMAGES_URL = reverse('tiers:customimages-list')
+
+
+class AccountPlanRegistryTests(TestCase):
+    """Test serializers built from registered plans."""
+
+    def setUp(self):
+        plans.clear_cache()
+        self.addCleanup(plans.clear_cache)
+
+    def test_default_plans_fields(self):
+        """Test default plans expose the fields of their tier."""
+        expected = {
+            'bp': ['id', 'name', 'link_200px'],
+            'pp': ['id', 'name', 'image', 'link_200px', 'link_400px'],
+            'ep': ['id', 'name', 'link_200px', 'link_400px',
+                   'expiring_link_val', 'expiring_link'],
+            'ap': ['id', 'name', 'image', 'custom_link',
+                   'custom_expiring_link'],
+        }
+        for code, fields in expected.items():
+            serializer_class = plans.serializer_for_plan(code)
+            self.assertEqual(list(serializer_class().fields), fields)
+
+    def test_serializer_memoized(self):
+        """Test plan serializer is built and loaded only once."""
+        serializer_class = plans.serializer_for_plan('pp')
+
+        with self.assertNumQueries(0):
+            self.assertIs(plans.serializer_for_plan('pp'), serializer_class)
+
+    def test_blank_plan_rejected(self):
+        """Test blank account_plan raises error."""
+        with self.assertRaises(ValueError):
+            plans.get_plan('')
+
+    def test_new_plan_without_deploy(self):
+        """Test a newly added plan is served its own fields."""
+        plans.serializer_for_plan('bp')
+        AccountPlan.objects.create(code='xp', name='Extra',
+                                   thumbnail_sizes=[400],
+                                   expiring_link=True)
+        user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+            account_plan='xp',
+        )
+        CustomImages.objects.create(user=user, name='Img1')
+        client = APIClient()
+        client.force_authenticate(user)
+
+        res = client.get(CUSTOM_IMAGES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(res.data['results'][0]),
+                         {'id', 'name', 'link_400px',
+                          'expiring_link_val', 'expiring_link'})
@@ -0,0 +1,184 @@
+"""
+Tests for collecting orphaned files from storage.
+"""
+import os
+import shutil
+import tempfile
+import time
+
+from io import StringIO
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.signals import request_started
+from django.test import TestCase, override_settings
+
+from tiers import storagegc
+from tiers.locks import try_file_lock
+from tiers.models import CustomImages, ImageBlob
+from tiers.storagegc import Collector, load_checkpoint
+
+KEPT = 'uploads/tier/ab/kept.jpg'
+ORPHAN = 'uploads/tier/cd/orphan.jpg'
+RECENT = 'uploads/tier/ef/recent.jpg'
+
+
+def thumbnail_name(source):
+    """Return name of a cache file rendered from source."""
+    return os.path.join(settings.IMAGEKIT_CACHEFILE_DIR,
+                        os.path.splitext(source)[0], 'thumb.jpg')
+
+
+class StorageCollectorTests(TestCase):
+    """Test collecting files no custom image references."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.override = override_settings(
+            MEDIA_ROOT=self.media_root,
+            RENDER_LOCK_DIR=os.path.join(self.media_root, 'locks'),
+            STORAGE_GC_CHECKPOINT=os.path.join(self.media_root, 'gc.json'),
+            STORAGE_GC_RATE=0,
+        )
+        self.override.enable()
+        user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        CustomImages.objects.create(user=user, name='Kept', image=KEPT)
+        for name in [KEPT, ORPHAN, thumbnail_name(KEPT),
+                     thumbnail_name(ORPHAN)]:
+            self._write(name, old=True)
+        self._write(RECENT, old=False)
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media_root)
+
+    def _path(self, name):
+        return os.path.join(self.media_root, name)
+
+    def _write(self, name, old):
+        path = self._path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(b'x' * 10)
+        if old:
+            past = time.time() - 2 * settings.STORAGE_GC_MIN_AGE
+            os.utime(path, (past, past))
+
+    def test_deletes_unreferenced_files(self):
+        """Test orphaned originals and their thumbnails are deleted."""
+        report = Collector().run()
+
+        self.assertTrue(report.finished)
+        self.assertEqual(report.scanned, 5)
+        self.assertEqual(report.deleted, 2)
+        self.assertEqual(report.reclaimed, 20)
+        for name in [ORPHAN, thumbnail_name(ORPHAN)]:
+            self.assertFalse(os.path.exists(self._path(name)))
+        for name in [KEPT, RECENT, thumbnail_name(KEPT)]:
+            self.assertTrue(os.path.exists(self._path(name)))
+        self.assertEqual(list(load_checkpoint()), ['ran_at'])
+
+    def test_deletes_released_blobs(self):
+        """Test blobs no custom image uses are deleted with their files,
+            while those still in use are kept."""
+        CustomImages.objects.all().delete()
+        ImageBlob.objects.create(digest='ab', name=KEPT, size=10,
+                                 ref_count=1)
+        ImageBlob.objects.create(digest='cd', name=ORPHAN, size=10)
+
+        report = Collector().run()
+
+        self.assertEqual(report.deleted, 1)
+        self.assertFalse(ImageBlob.objects.filter(name=ORPHAN).exists())
+        for name in [ORPHAN, thumbnail_name(ORPHAN)]:
+            self.assertFalse(os.path.exists(self._path(name)))
+        self.assertTrue(ImageBlob.objects.filter(name=KEPT).exists())
+        for name in [KEPT, thumbnail_name(KEPT)]:
+            self.assertTrue(os.path.exists(self._path(name)))
+
+    def test_keeps_files_replaced_meanwhile(self):
+        """Test files rewritten after they were examined are kept."""
+        referenced = storagegc._referenced_originals
+
+        def upload_again(names):
+            self._write(ORPHAN, old=False)
+            return referenced(names)
+
+        with patch('tiers.storagegc._referenced_originals', upload_again):
+            report = Collector().run()
+
+        self.assertTrue(os.path.exists(self._path(ORPHAN)))
+        self.assertEqual(report.deleted, 0)
+
+    def test_dry_run_keeps_files(self):
+        """Test dry run only reports what it would delete."""
+        report = Collector(dry_run=True).run()
+
+        self.assertEqual(report.deleted, 1)
+        self.assertTrue(os.path.exists(self._path(ORPHAN)))
+        self.assertEqual(load_checkpoint(), {})
+
+    def test_resumes_from_checkpoint(self):
+        """Test limited runs continue where the previous one stopped."""
+        collector = Collector(batch_size=1)
+
+        first = collector.run(limit=2)
+        self.assertFalse(first.finished)
+        self.assertEqual(first.scanned, 2)
+        checkpoint = load_checkpoint()
+        self.assertEqual(checkpoint['phase'], 'originals')
+        self.assertEqual(checkpoint['after'], 'cd/orphan.jpg')
+
+        second = collector.run()
+        self.assertTrue(second.finished)
+        self.assertEqual(second.scanned, 3)
+        self.assertEqual(first.deleted + second.deleted, 2)
+
+    def test_skips_run_within_interval(self):
+        """Test scheduled runs skip when a run started recently."""
+        Collector().run()
+        self._write(ORPHAN, old=True)
+
+        report = Collector().run(interval=3600)
+
+        self.assertTrue(report.skipped)
+        self.assertEqual(report.scanned, 0)
+        self.assertTrue(os.path.exists(self._path(ORPHAN)))
+
+    def test_skips_run_while_locked(self):
+        """Test runs skip while another process collects."""
+        with try_file_lock('storage-gc'):
+            report = Collector().run()
+
+        self.assertTrue(report.skipped)
+        self.assertTrue(os.path.exists(self._path(ORPHAN)))
+
+    @override_settings(STORAGE_GC_INTERVAL=3600)
+    @patch('tiers.storagegc.threading.Thread')
+    def test_scheduler_starts_on_first_request(self, thread):
+        """Test scheduler thread starts with requests, not on import."""
+        self.addCleanup(request_started.disconnect,
+                        dispatch_uid='storage-gc')
+        self.addCleanup(setattr, storagegc, '_scheduler', None)
+
+        storagegc.start_scheduler()
+        thread.assert_not_called()
+
+        for _ in range(2):
+            request_started.send(sender=None)
+        thread.assert_called_once()
+        thread.return_value.start.assert_called_once_with()
+
+    def test_command(self):
+        """Test command reports bytes reclaimed."""
+        out = StringIO()
+
+        call_command('collect_storage', stdout=out)
+
+        self.assertIn('reclaimed 20 bytes', out.getvalue())
+        self.assertFalse(os.path.exists(self._path(ORPHAN)))
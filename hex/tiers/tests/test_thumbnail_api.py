@@ -0,0 +1,124 @@
+"""
+Tests for the dynamic thumbnail API.
+"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from PIL import Image
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from tiers import formats, plans
+from tiers.models import AccountPlan, CustomImages
+from tiers.thumbnails import SingleFlight, ThumbnailCache, thumbnail_cache
+
+
+def thumbnail_url(custom_images_id, size):
+    """Create and return a dynamic thumbnail url."""
+    url = reverse('tiers:customimages-thumbnail', args=[custom_images_id])
+    return f'{url}?size={size}'
+
+
+class ThumbnailApiTests(TestCase):
+    """Test rendering thumbnails of sizes allowed by plan."""
+
+    def setUp(self):
+        plans.clear_cache()
+        self.addCleanup(plans.clear_cache)
+        AccountPlan.objects.create(code='xp', name='Extra',
+                                   thumbnail_sizes=[200, 300])
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+            account_plan='xp',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.custom_img = CustomImages.objects.create(user=self.user,
+                                                      name='Image1')
+        with tempfile.NamedTemporaryFile(suffix='.png') as image_file:
+            Image.new('RGB', (500, 500)).save(image_file, format='PNG')
+            image_file.seek(0)
+            self.custom_img.image.save('image.png', image_file)
+
+    def tearDown(self):
+        self.custom_img.image.delete()
+
+    def test_render_allowed_size(self):
+        """Test thumbnail of allowed size is rendered and cached."""
+        res = self.client.get(thumbnail_url(self.custom_img.id, 300))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        thumbnail = Image.open(BytesIO(b''.join(res.streaming_content)))
+        self.assertEqual(thumbnail.size, (300, 300))
+        name = thumbnail_cache.name(self.custom_img, 300, formats.JPEG)
+        self.assertTrue(default_storage.exists(name))
+        default_storage.delete(name)
+
+    def test_size_not_in_plan_forbidden(self):
+        """Test size missing from account plan is refused."""
+        res = self.client.get(thumbnail_url(self.custom_img.id, 500))
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_invalid_size(self):
+        """Test size must be an integer."""
+        res = self.client.get(thumbnail_url(self.custom_img.id, 'big'))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ThumbnailCacheTests(SimpleTestCase):
+    """Test bounded thumbnail cache and request coalescing."""
+
+    def test_single_flight_runs_once(self):
+        """Test concurrent calls with the same key share one run."""
+        flight = SingleFlight()
+        calls = []
+
+        def render():
+            calls.append(1)
+            time.sleep(0.1)
+            return 'done'
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(flight.do('key', render))
+            )
+            for i in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['done'] * 5)
+
+    def test_evict_least_recently_used(self):
+        """Test oldest files are evicted over the size budget."""
+        location = 'CACHE/test-eviction'
+        root = default_storage.path(location)
+        self.addCleanup(shutil.rmtree, root, True)
+        os.makedirs(root)
+        for age, filename in enumerate(['new', 'middle', 'old']):
+            path = os.path.join(root, filename)
+            with open(path, 'wb') as cache_file:
+                cache_file.write(b'x' * 10)
+            os.utime(path, (time.time() - age, time.time() - age))
+
+        ThumbnailCache(location, max_bytes=20).evict()
+
+        self.assertEqual(sorted(os.listdir(root)), ['middle', 'new'])
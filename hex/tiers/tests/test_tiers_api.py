@@ -1,10 +1,20 @@
 """Tests for API tiers."""
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+import hashlib
 import tempfile
+from io import BytesIO
 import os
 
+from types import SimpleNamespace
+from unittest.mock import patch
+
 from PIL import Image
 
 from tiers import models
@@ -13,7 +23,7 @@ from django.contrib.auth import get_user_model
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from tiers import serializers
+from tiers import blobs, listcache, plans, serializers
 
 TIERS_URL = reverse('tiers:tier-list')
 CUSTOM_IMAGES_URL = reverse('tiers:customimages-list')
@@ -93,7 +103,37 @@ class PrivateTiersApiTests(TestCase):
         tiers = models.Tier.objects.all().order_by('-id')
         serializer = serializers.TierSerializer(tiers, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
+
+    @override_settings(LIST_CACHE_TTL=0)
+    def test_retrieve_tiers_constant_queries(self):
+        """Test listing tiers runs the same queries for any tier count."""
+        def create_tiers(count):
+            for i in range(count):
+                tier = create_tier(user=self.user)
+                tier.custom_images.add(
+                    create_custom_images(user=self.user, name=f'Img{i}'),
+                    create_custom_images(user=self.user, name=f'Other{i}'),
+                )
+
+        def list_queries():
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.get(TIERS_URL)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            return res, len(queries)
+
+        create_tiers(1)
+        list_queries()  # Loads account plans, cached in process after.
+        res, one_tier = list_queries()
+        self.assertEqual(len(res.data['results']), 1)
+
+        create_tiers(9)
+        res, ten_tiers = list_queries()
+
+        self.assertEqual(ten_tiers, one_tier)
+        self.assertEqual(ten_tiers, 2)
+        self.assertEqual(len(res.data['results']), 10)
+        self.assertEqual(len(res.data['results'][0]['custom_images']), 2)
 
     def test_get_tier_detail(self):
         """Test get tier detail."""
@@ -170,10 +210,10 @@ class PrivateTiersApiTests(TestCase):
         res = self.client.get(CUSTOM_IMAGES_URL)
 
         customs = models.CustomImages.objects.filter(user=self.user)
-        serializer = serializers.BasicCustomImagesSerializer(customs,
-                                                             many=True)
+        serializer_class = plans.serializer_for_plan('bp')
+        serializer = serializer_class(customs, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_clear_tiers_custom_images(self):
         """Test clearing a tiers custom images
@@ -191,6 +231,57 @@ class PrivateTiersApiTests(TestCase):
         self.assertEqual(tiers.custom_images.count(), 1)
 
 
+class TierSerializerTests(TestCase):
+    """Test creating and updating tiers with nested custom images."""
+
+    def setUp(self):
+        self.user = create_user(email='user@example.com',
+                                password='test123')
+        self.context = {'request': SimpleNamespace(user=self.user)}
+
+    def test_create_tier_with_custom_images(self):
+        """Test nested custom images are resolved in constant queries."""
+        create_custom_images(user=self.user, name='Img0')
+        payload = {
+            'title': 'Tier',
+            'custom_images': [{'name': f'Img{i}'} for i in range(20)],
+        }
+        serializer = serializers.TierSerializer(data=payload,
+                                                context=self.context)
+        self.assertTrue(serializer.is_valid())
+
+        with self.assertNumQueries(5):
+            tier = serializer.save(user=self.user)
+
+        self.assertEqual(tier.custom_images.count(), 20)
+        self.assertEqual(
+            models.CustomImages.objects.filter(user=self.user).count(), 20
+        )
+
+    def test_update_tier_custom_images(self):
+        """Test updating custom images keeps unchanged assignments."""
+        kept = create_custom_images(user=self.user, name='Kept')
+        removed = create_custom_images(user=self.user, name='Removed')
+        tier = create_tier(user=self.user)
+        tier.custom_images.add(kept, removed)
+
+        payload = {'custom_images': [{'name': 'Kept'}, {'name': 'New'}]}
+        serializer = serializers.TierSerializer(tier,
+                                                data=payload,
+                                                partial=True,
+                                                context=self.context)
+        self.assertTrue(serializer.is_valid())
+        serializer.save()
+
+        names = set(tier.custom_images.values_list('name', flat=True))
+        self.assertEqual(names, {'Kept', 'New'})
+        self.assertTrue(
+            models.Tier.custom_images.through.objects.filter(
+                tier=tier, customimages=kept
+            ).exists()
+        )
+
+
 class UploadImageTest(TestCase):
 
     def setUp(self):
@@ -219,3 +310,283 @@ class UploadImageTest(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertIn('image', res.data)
         self.assertTrue(os.path.exists(self.CustomImages.image.path))
+
+    def test_upload_same_image_stored_once(self):
+        """Test identical uploads share one content addressed original."""
+        other = create_custom_images(user=self.user, name='other')
+        self._upload_sample_image()
+        res = self.client.post(image_upload_url(other.id),
+                               {'image': self._sample_image_file()},
+                               format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.CustomImages.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.CustomImages.image.name, other.image.name)
+        blob = models.ImageBlob.objects.get()
+        self.assertEqual(blob.name, other.image.name)
+        self.assertIn(blob.digest, blob.name)
+        self.assertEqual(blob.ref_count, 2)
+
+    @override_settings(STORAGE_CLEANUP_WORKERS=0)
+    def test_delete_last_reference_removes_original(self):
+        """Test original is removed along with its last custom image."""
+        other = create_custom_images(user=self.user, name='other')
+        self._upload_sample_image()
+        self.client.post(image_upload_url(other.id),
+                         {'image': self._sample_image_file()},
+                         format='multipart')
+        self.CustomImages.refresh_from_db()
+        other.refresh_from_db()
+        path = self.CustomImages.image.path
+
+        with self.captureOnCommitCallbacks(execute=True):
+            other.delete()
+        self.assertEqual(models.ImageBlob.objects.get().ref_count, 1)
+        self.assertTrue(os.path.exists(path))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.CustomImages.delete()
+        self.assertFalse(models.ImageBlob.objects.exists())
+        self.assertFalse(os.path.exists(path))
+
+    @override_settings(STORAGE_CLEANUP_WORKERS=0)
+    def test_reupload_same_image_keeps_one_reference(self):
+        """Test re-uploading identical content doesn't leak references."""
+        for _ in range(3):
+            self.client.post(image_upload_url(self.CustomImages.id),
+                             {'image': self._sample_image_file()},
+                             format='multipart')
+        self.assertEqual(models.ImageBlob.objects.get().ref_count, 1)
+        self.CustomImages.refresh_from_db()
+        path = self.CustomImages.image.path
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.CustomImages.delete()
+        self.assertFalse(models.ImageBlob.objects.exists())
+        self.assertFalse(os.path.exists(path))
+
+    def test_new_blob_replaces_stale_file(self):
+        """Test file left by a deleted blob is replaced, not trusted."""
+        image_file = self._sample_image_file()
+        content = image_file.getvalue()
+        name = blobs.blob_file_path(hashlib.sha256(content).hexdigest(),
+                                    image_file.name)
+        default_storage.save(name, ContentFile(b'about to be deleted'))
+
+        self.client.post(image_upload_url(self.CustomImages.id),
+                         {'image': image_file},
+                         format='multipart')
+
+        self.CustomImages.refresh_from_db()
+        self.assertEqual(self.CustomImages.image.name, name)
+        with default_storage.open(name) as stored:
+            self.assertEqual(stored.read(), content)
+        self.CustomImages.image.delete()
+
+    def test_upload_hashes_image_while_streaming(self):
+        """Test digest and size are stored without re-reading upload."""
+        image_file = self._sample_image_file()
+        content = image_file.getvalue()
+
+        with patch('tiers.blobs.file_digest') as file_digest:
+            res = self.client.post(image_upload_url(self.CustomImages.id),
+                                   {'image': image_file},
+                                   format='multipart')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        file_digest.assert_not_called()
+        self.CustomImages.refresh_from_db()
+        self.assertEqual(self.CustomImages.image_sha256,
+                         hashlib.sha256(content).hexdigest())
+        self.assertEqual(self.CustomImages.image_bytes, len(content))
+
+    def _sample_image_file(self):
+        """Return in-memory copy of the sample image."""
+        image_file = BytesIO()
+        Image.new('RGB', (10, 10)).save(image_file, format='PNG')
+        image_file.name = 'sample.jpg'
+        image_file.seek(0)
+        return image_file
+
+    def _upload_sample_image(self):
+        """Upload a sample image to the custom images."""
+        url = image_upload_url(self.CustomImages.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            img = Image.new('RGB', (10, 10))
+            img.save(image_file, format='PNG')
+            image_file.seek(0)
+            payload = {'image': image_file}
+            return self.client.post(url, payload, format='multipart')
+
+    def test_upload_image_thumbnails_pending(self):
+        """Test thumbnails are pending until rendering is done."""
+        res = self._upload_sample_image()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.CustomImages.refresh_from_db()
+        self.assertFalse(self.CustomImages.thumbnails_ready)
+
+        res = self.client.get(CUSTOM_IMAGES_URL)
+
+        self.assertEqual(res.data['results'][0]['link_200px'],
+                         serializers.ThumbnailField.PENDING)
+
+    @override_settings(THUMBNAIL_RENDER_WORKERS=0)
+    def test_upload_image_renders_thumbnails(self):
+        """Test thumbnails are rendered after upload is committed."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self._upload_sample_image()
+
+        self.CustomImages.refresh_from_db()
+        self.assertTrue(self.CustomImages.thumbnails_ready)
+        self.assertTrue(
+            os.path.exists(self.CustomImages.link_200px.path)
+        )
+
+    @override_settings(THUMBNAIL_RENDER_WORKERS=0)
+    def test_list_uses_thumbnail_index(self):
+        """Test listing indexed thumbnails skips storage existence checks."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self._upload_sample_image()
+        thumbnail = self.CustomImages.thumbnails.get(spec='link_200px')
+        cache.clear()
+
+        with patch('django.core.files.storage.FileSystemStorage.exists') \
+                as mock_exists:
+            res = self.client.get(CUSTOM_IMAGES_URL)
+
+        mock_exists.assert_not_called()
+        link = res.data['results'][0]['link_200px']
+        self.assertTrue(link.endswith(thumbnail.name))
+
+    @override_settings(THUMBNAIL_RENDER_WORKERS=0)
+    def test_upload_image_invalidates_thumbnail_index(self):
+        """Test replacing the image drops thumbnails of the old source."""
+        with self.captureOnCommitCallbacks(execute=True):
+            self._upload_sample_image()
+        self.assertTrue(self.CustomImages.thumbnails.exists())
+
+        self._upload_sample_image()
+
+        self.assertFalse(self.CustomImages.thumbnails.exists())
+
+    def test_upload_image_records_metadata(self):
+        """Test image header metadata is stored with the upload."""
+        self._upload_sample_image()
+
+        self.CustomImages.refresh_from_db()
+        self.assertEqual(self.CustomImages.image_width, 10)
+        self.assertEqual(self.CustomImages.image_height, 10)
+        self.assertEqual(self.CustomImages.image_format, 'PNG')
+        self.assertEqual(self.CustomImages.image_bytes,
+                         self.CustomImages.image.size)
+
+    def test_upload_image_over_pixel_budget(self):
+        """Test image larger than plan pixel budget is refused."""
+        self.addCleanup(plans.clear_cache)
+        models.AccountPlan.objects.create(code='sp', name='Small',
+                                          thumbnail_sizes=[200],
+                                          max_pixels=50)
+        self.user.account_plan = 'sp'
+        self.user.save()
+
+        res = self._upload_sample_image()
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('image', res.data)
+        self.CustomImages.refresh_from_db()
+        self.assertFalse(self.CustomImages.image)
+
+
+class ListCacheTests(TestCase):
+    """Test caching of list responses."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com',
+                                password='testpass123')
+        self.client.force_authenticate(self.user)
+        self.tier = create_tier(user=self.user)
+        self.custom_img = create_custom_images(user=self.user)
+
+    def test_cached_list_skips_database(self):
+        """Test repeated list is served from cache without queries."""
+        for url in [TIERS_URL, CUSTOM_IMAGES_URL]:
+            res = self.client.get(url)
+
+            with self.assertNumQueries(0):
+                cached = self.client.get(url)
+
+            self.assertEqual(cached.status_code, status.HTTP_200_OK)
+            self.assertEqual(cached.content, res.content)
+            self.assertEqual(cached['ETag'], res['ETag'])
+
+    def test_not_modified_when_etag_matches(self):
+        """Test unchanged list answers 304 to conditional request."""
+        res = self.client.get(TIERS_URL)
+
+        res = self.client.get(TIERS_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_change_invalidates_lists(self):
+        """Test saving custom images and tiers invalidates cached lists."""
+        etag = self.client.get(CUSTOM_IMAGES_URL)['ETag']
+        create_custom_images(user=self.user, name='Image2')
+
+        res = self.client.get(CUSTOM_IMAGES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 2)
+
+        etag = self.client.get(TIERS_URL)['ETag']
+        self.tier.custom_images.add(self.custom_img)
+
+        res = self.client.get(TIERS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results'][0]['custom_images']), 1)
+
+    def test_short_expiring_links_not_cached(self):
+        """Test lists aren't cached longer than half their expiring
+            links live."""
+        self.user.account_plan = 'ep'
+        self.user.save()
+        create_custom_images(user=self.user, name='Expiring',
+                             image='uploads/tier/expiring.jpg',
+                             expiring_link_val=1)
+
+        res = self.client.get(CUSTOM_IMAGES_URL)
+        res = self.client.get(CUSTOM_IMAGES_URL,
+                              HTTP_IF_NONE_MATCH=res['ETag'])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsNone(
+            listcache._cache().get(res.renderer_context['view']
+                                   .list_cache_key)
+        )
+
+    def test_plan_change_invalidates_lists(self):
+        """Test changing the user's account plan invalidates lists."""
+        self.addCleanup(plans.clear_cache)
+        etag = self.client.get(CUSTOM_IMAGES_URL)['ETag']
+        plan = models.AccountPlan.objects.get(code=self.user.account_plan)
+        plan.original_image = not plan.original_image
+        plan.save()
+
+        res = self.client.get(CUSTOM_IMAGES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_lists_cached_per_user(self):
+        """Test cached lists are never served to another user."""
+        self.client.get(TIERS_URL)
+        other = create_user(email='other@example.com',
+                            password='testpass123')
+        self.client.force_authenticate(other)
+
+        res = self.client.get(TIERS_URL)
+
+        self.assertEqual(res.data['results'], [])
@@ -0,0 +1,154 @@
+"""
+On demand thumbnails of any size, kept in a bounded disk cache.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+from imagekit.registry import generator_registry
+
+from tiers import formats, metrics
+from tiers.locks import file_lock
+
+
+class SingleFlight:
+    """Run a function once per key at a time, concurrent callers
+        with the same key wait for and share its result."""
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = self._Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except Exception as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+class ThumbnailCache:
+    """Disk cache of rendered thumbnails, least recently used files
+        are evicted once total size exceeds max_bytes."""
+
+    def __init__(self, location, max_bytes):
+        self.location = location
+        self.max_bytes = max_bytes
+        self._flight = SingleFlight()
+        self._lock = threading.Lock()
+        self._written = 0
+
+    def name(self, custom_img, size, format):
+        """Return storage name of thumbnail of custom image source."""
+        digest = hashlib.sha256(
+            f'{custom_img.image.name}:{size}:{format}'.encode()
+        ).hexdigest()
+        extension = formats.EXTENSIONS[format]
+        return os.path.join(self.location, digest[:2],
+                            f'{digest}.{extension}')
+
+    def get_or_render(self, custom_img, size, format=formats.JPEG):
+        """Return storage name of the thumbnail, rendering it if missing."""
+        name = self.name(custom_img, size, format)
+        path = default_storage.path(name)
+        try:
+            # Modification time tracks last use for eviction.
+            os.utime(path)
+            return name
+        except FileNotFoundError:
+            pass
+        return self._flight.do(
+            name, lambda: self._render(custom_img, size, format, name, path)
+        )
+
+    def _render(self, custom_img, size, format, name, path):
+        with file_lock(name) as waited:
+            if os.path.exists(path):
+                if waited:
+                    metrics.incr(metrics.COALESCED)
+                return name
+            self._write(custom_img, size, format, path)
+        metrics.incr(metrics.RENDERED)
+        self._track(os.path.getsize(path))
+        return name
+
+    def _write(self, custom_img, size, format, path):
+        """Render thumbnail and atomically move it into place."""
+        generator = generator_registry.get(
+            'tiers:customimages:thumbnails',
+            source=custom_img.image,
+            sizes=[(size, size)],
+        )
+        content = generator.generate_all([format])[(size, size), format]
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as tmp_file:
+            tmp_file.write(content.read())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+
+    def _track(self, written):
+        """Evict after every twentieth of the budget written."""
+        with self._lock:
+            self._written += written
+            if self._written * 20 < self.max_bytes:
+                return
+            self._written = 0
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used thumbnails over the size budget."""
+        root = default_storage.path(self.location)
+        entries = []
+        total = 0
+        for dirpath, dirnames, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+        entries.sort()
+        for mtime, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+thumbnail_cache = ThumbnailCache(settings.DYNAMIC_THUMBNAIL_DIR,
+                                 settings.DYNAMIC_THUMBNAIL_CACHE_BYTES)
@@ -9,7 +9,7 @@ from django.urls import (
 
 from rest_framework.routers import DefaultRouter
 
-from . import views
+from . import async_views, views
 
 
 router = DefaultRouter()
@@ -20,5 +20,22 @@ app_name = 'tiers'
 
 urlpatterns = [
     path('', include(router.urls)),
-
+    path('expiring/<str:token>/',
+         views.ExpiringLinkView.as_view(),
+         name='expiring-link'),
+    path('render-stats/',
+         views.RenderStatsView.as_view(),
+         name='render-stats'),
+    path('async/tiers/',
+         async_views.tier_list,
+         name='async-tier-list'),
+    path('async/tiers/<int:pk>/',
+         async_views.tier_detail,
+         name='async-tier-detail'),
+    path('async/custom_images/',
+         async_views.custom_images_list,
+         name='async-customimages-list'),
+    path('async/custom_images/<int:pk>/download/',
+         async_views.custom_images_download,
+         name='async-customimages-download'),
 ]
@@ -1,6 +1,16 @@
 """
 Views for tiers
 """
+import os
+
+from functools import partial
+
+from django.core import signing
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.http import FileResponse
+from django.utils.cache import patch_vary_headers
+
 from drf_spectacular.utils import (
     extend_schema_view,
     extend_schema,
@@ -12,30 +22,48 @@ from rest_framework import (
     viewsets,
     mixins,
     status,
+    exceptions,
 )
 
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.authentication import (
-    SessionAuthentication,
-    TokenAuthentication,
-)
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from user.authentication import CachedTokenAuthentication
+
+from .pagination import TierPagination, CustomImagesPagination
+from .parsers import StreamingMultiPartParser
 from .permissons import UserPermission
 
 from tiers.models import (
     Tier,
     CustomImages,
 )
-from tiers import serializers
+from tiers import (
+    serializers,
+    blobs,
+    fastlist,
+    listcache,
+    rendering,
+    links,
+    delivery,
+    plans,
+    metrics,
+    formats,
+    signals,
+)
+from tiers.thumbnails import thumbnail_cache
 
 
-class TierViewSet(viewsets.ModelViewSet):
+class TierViewSet(listcache.CachedListMixin, viewsets.ModelViewSet):
     """View for manage tiers APIs."""
     serializer_class = serializers.TierDetailSerializer
     queryset = Tier.objects.all()
-    authentication_classes = [TokenAuthentication, SessionAuthentication]
+    authentication_classes = [CachedTokenAuthentication,
+                              SessionAuthentication]
     permission_classes = [UserPermission]
+    pagination_class = TierPagination
 
     def _params_to_ints(self, qs):
         """Converts a list of strings to integers."""
@@ -46,7 +74,7 @@ class TierViewSet(viewsets.ModelViewSet):
         queryset = self.queryset
         return queryset.filter(
             user=self.request.user
-        ).order_by('-id').distinct()
+        ).prefetch_related('custom_images').order_by('-id')
 
     def get_serializer_class(self):
         """Return the serializer class for request."""
@@ -68,34 +96,72 @@ class TierViewSet(viewsets.ModelViewSet):
                 description='Filter by items assigned to tiers.',
             )
         ]
-    )
+    ),
+    download=extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'spec',
+                OpenApiTypes.STR,
+                description='Original image or thumbnail to download.',
+            )
+        ],
+        responses={(200, 'image/*'): OpenApiTypes.BINARY},
+    ),
+    thumbnail=extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'size',
+                OpenApiTypes.INT,
+                required=True,
+                description='Thumbnail size allowed by account plan.',
+            )
+        ],
+        responses={
+            (200, 'image/jpeg'): OpenApiTypes.BINARY,
+            (200, 'image/webp'): OpenApiTypes.BINARY,
+        },
+    ),
 )
-class CustomImagesViewSet(mixins.DestroyModelMixin,
+class CustomImagesViewSet(listcache.CachedListMixin,
+                          fastlist.FastListMixin,
+                          mixins.DestroyModelMixin,
                           mixins.UpdateModelMixin,
                           mixins.ListModelMixin,
                           mixins.CreateModelMixin,
                           viewsets.GenericViewSet):
 
     """Manage Custom Images in database."""
-    authentication_classes = [TokenAuthentication, SessionAuthentication]
+    authentication_classes = [CachedTokenAuthentication,
+                              SessionAuthentication]
     permission_classes = [IsAuthenticated]
     serializer_class = serializers.BaseCustomImagesSerializer
+    pagination_class = CustomImagesPagination
+
+    def perform_content_negotiation(self, request, force=False):
+        """Image responses answer any Accept header, e.g. image/webp."""
+        if self.action in ('download', 'thumbnail'):
+            force = True
+        return super().perform_content_negotiation(request, force)
 
     def get_serializer_class(self):
         """Get serializer class belong to tier account. """
         if self.action == 'upload_image':
             return serializers.CustomImagesImageSerializer
-        if not self.request.user.account_plan == '':
-            if self.request.user.account_plan == 'bp':
-                return serializers.BasicCustomImagesSerializer
-            elif self.request.user.account_plan == 'pp':
-                return serializers.PremiumCustomImagesSerializer
-            elif self.request.user.account_plan == 'ep':
-                return serializers.EnterpriseCustomImagesSerializer
-            else:
-                return serializers.AdminCustomImagesSerializer
-        else:
-            raise ValueError("account_plan for images can't be blank")
+        if self.action == 'bulk_upload':
+            return serializers.CustomImagesBulkUploadSerializer
+        if self.action == 'bulk_change':
+            if self.request.method == 'DELETE':
+                return serializers.CustomImagesBulkDeleteSerializer
+            return serializers.CustomImagesBulkUpdateSerializer
+        return plans.serializer_for_plan(self.request.user.account_plan)
+
+    def get_serializer_context(self):
+        """Add pixel budget of account plan for uploads."""
+        context = super().get_serializer_context()
+        if self.action in ('upload_image', 'bulk_upload'):
+            plan = plans.get_plan(self.request.user.account_plan)
+            context['max_pixels'] = plan.max_pixels
+        return context
 
     def get_queryset(self):
         """Filter queryset to authenticated user."""
@@ -104,9 +170,14 @@ class CustomImagesViewSet(mixins.DestroyModelMixin,
         )
         queryset = self.queryset
         if assigned_only:
-            queryset = queryset.filter(customimages__isnull=False)
+            queryset = queryset.filter(Exists(
+                Tier.custom_images.through.objects.filter(
+                    customimages=OuterRef('pk'),
+                )
+            ))
         return queryset.filter(
-            user=self.request.user).order_by('-name').distinct()
+            user=self.request.user
+        ).prefetch_related('thumbnails').order_by('-name')
 
     queryset = CustomImages.objects.all()
 
@@ -117,10 +188,180 @@ class CustomImagesViewSet(mixins.DestroyModelMixin,
         serializer = self.get_serializer(custom_img, data=request.data)
 
         if serializer.is_valid():
-            serializer.save()
+            serializer.save(thumbnails_ready=False)
+            custom_img.thumbnails.all().delete()
+            transaction.on_commit(
+                lambda: rendering.schedule_render(custom_img.id)
+            )
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(methods=['POST'], detail=False, url_path='bulk-upload',
+            parser_classes=[StreamingMultiPartParser])
+    def bulk_upload(self, request):
+        """Create custom images from many uploaded images at once."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        results = []
+        new_images = []
+        uploads = []
+        for image in serializer.validated_data['images']:
+            image_serializer = serializers.CustomImagesImageSerializer(
+                data={'image': image},
+                context=self.get_serializer_context(),
+            )
+            if not image_serializer.is_valid():
+                results.append({'name': image.name,
+                                'errors': image_serializer.errors})
+                continue
+            validated_data = dict(image_serializer.validated_data)
+            # The uploaded file, hashed by upload handlers while parsing.
+            uploads.append(validated_data.pop('image'))
+            custom_img = CustomImages(
+                user=request.user,
+                name=os.path.splitext(image.name)[0][:255],
+                **validated_data,
+            )
+            new_images.append(custom_img)
+            results.append(custom_img)
+
+        with transaction.atomic():
+            for custom_img, upload in zip(new_images, uploads):
+                custom_img.image = blobs.store(upload).name
+            CustomImages.objects.bulk_create(new_images)
+            listcache.bump(request.user.id)
+            for custom_img in new_images:
+                transaction.on_commit(
+                    partial(rendering.schedule_render, custom_img.id)
+                )
+
+        results = [
+            serializers.BaseCustomImagesSerializer(result).data
+            if isinstance(result, CustomImages) else result
+            for result in results
+        ]
+        if new_images:
+            return Response(results, status=status.HTTP_201_CREATED)
+        return Response(results, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(methods=['PATCH', 'DELETE'], detail=False, url_path='bulk')
+    def bulk_change(self, request):
+        """Update or delete many custom images of the user at once."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = dict(serializer.validated_data)
+        queryset = CustomImages.objects.filter(user=request.user,
+                                               id__in=data.pop('ids'))
+
+        with transaction.atomic():
+            if request.method == 'DELETE':
+                names = list(queryset.select_for_update()
+                             .values_list('image', flat=True))
+                with signals.bulk_change():
+                    deleted = queryset.delete()[1].get(
+                        CustomImages._meta.label, 0
+                    )
+                blobs.release_many(names)
+                result = {'deleted': deleted}
+            else:
+                plan = plans.get_plan(request.user.account_plan)
+                if not plan.expiring_link:
+                    raise exceptions.PermissionDenied(
+                        'Your account plan does not allow expiring links.'
+                    )
+                result = {'updated': queryset.update(**data)}
+            listcache.bump(request.user.id)
+        return Response(result, status=status.HTTP_200_OK)
+
+    @action(methods=['GET'], detail=True, url_path='download')
+    def download(self, request, pk=None):
+        """Download original image or one of its thumbnails."""
+        return self.serve_download(request)
+
+    def serve_download(self, request, response_class=FileResponse):
+        """Return response sending the requested image file."""
+        custom_img = self.get_object()
+        spec = request.query_params.get('spec', links.ORIGINAL)
+        plan = plans.get_plan(request.user.account_plan)
+        if spec not in plans.downloadable_specs(plan):
+            raise exceptions.PermissionDenied(
+                'Your account plan does not allow this download.'
+            )
+        if not custom_img.image:
+            raise exceptions.NotFound('Custom image has no image.')
+
+        if spec == links.ORIGINAL:
+            etag = custom_img.image_sha256 \
+                and '"%s"' % custom_img.image_sha256
+            return delivery.serve_file(request, custom_img.image.name, etag,
+                                       response_class)
+
+        if rendering.spec_size(getattr(custom_img, spec)) is None:
+            raise exceptions.NotFound('Thumbnail has no size set yet.')
+        cachefile = formats.variant(getattr(custom_img, spec),
+                                    formats.negotiate(request))
+        cachefile.generate()
+        response = delivery.serve_file(request, cachefile.name,
+                                       response_class=response_class)
+        patch_vary_headers(response, ['Accept'])
+        return response
+
+    @action(methods=['GET'], detail=True, url_path='thumbnail')
+    def thumbnail(self, request, pk=None):
+        """Get thumbnail of any size the account plan allows."""
+        try:
+            size = int(request.query_params['size'])
+        except (KeyError, ValueError):
+            raise exceptions.ValidationError(
+                {'size': 'A valid integer is required.'}
+            )
+        plan = plans.get_plan(request.user.account_plan)
+        if size not in plan.thumbnail_sizes:
+            raise exceptions.PermissionDenied(
+                'Your account plan does not allow this thumbnail size.'
+            )
+        custom_img = self.get_object()
+        if not custom_img.image:
+            raise exceptions.NotFound('Custom image has no image.')
+
+        name = thumbnail_cache.get_or_render(custom_img, size,
+                                             formats.negotiate(request))
+        response = delivery.serve_file(request, name)
+        patch_vary_headers(response, ['Accept'])
+        return response
+
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
+
+
+class ExpiringLinkView(APIView):
+    """Stream image file behind a signed, expiring link.
+        Token alone grants access, so no database query is made."""
+    authentication_classes = []
+    permission_classes = []
+
+    def perform_content_negotiation(self, request, force=False):
+        """Image responses answer any Accept header, e.g. image/webp."""
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request, token):
+        try:
+            payload = links.load_token(token)
+        except links.LinkExpired:
+            raise exceptions.PermissionDenied('Link expired.')
+        except signing.BadSignature:
+            raise exceptions.PermissionDenied('Invalid link.')
+
+        return delivery.serve_file(request, payload['name'])
+
+
+class RenderStatsView(APIView):
+    """Thumbnail rendering counters for monitoring."""
+    authentication_classes = [CachedTokenAuthentication,
+                              SessionAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(metrics.snapshot())
@@ -0,0 +1,22 @@
+"""
+Signals keeping cached authentication up to date.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from rest_framework.authtoken.models import Token
+
+from user.authentication import token_cache
+
+
+@receiver([post_save, post_delete], sender=Token)
+def invalidate_token(sender, instance, **kwargs):
+    """Drop rotated or deleted token from the cache."""
+    token_cache.invalidate(instance.key)
+
+
+@receiver([post_save, post_delete], sender=get_user_model())
+def invalidate_user_tokens(sender, instance, **kwargs):
+    """Drop tokens of changed user, e.g. deactivated or with new plan."""
+    token_cache.invalidate_user(instance.pk)
@@ -12,6 +12,7 @@ from django.contrib.auth import (
     logout, authenticate)
 
 
+from user.authentication import CachedTokenAuthentication
 from user.serializers import (
     UserSerializer,
     AuthTokenSerializer,
@@ -87,7 +88,8 @@ class ManageUserView(generics.RetrieveUpdateAPIView):
         if not self.request.user.is_staff:
             return NormalUserSerializer
 
-    authentication_classes = [authentication.TokenAuthentication, authentication.SessionAuthentication, ]
+    authentication_classes = [CachedTokenAuthentication,
+                              authentication.SessionAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def update(self, request, *args, **kwargs):